@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import logging
+import multiprocessing
 import os
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config, pool
+from sqlalchemy.engine import Engine, make_url
 from alembic import context
 
 # This is the Alembic Config object, which provides access to the values within the .ini file in use.
@@ -14,7 +17,8 @@ if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
 # Set SQLAlchemy URL from environment (fallback to config value)
-db_url = os.getenv("DATABASE_URL", config.get_main_option("sqlalchemy.url"))
+# (the ini value interpolates %(DATABASE_URL)s, so only read it as a fallback)
+db_url = os.getenv("DATABASE_URL") or config.get_main_option("sqlalchemy.url")
 if db_url:
     config.set_main_option("sqlalchemy.url", db_url)
 
@@ -42,13 +46,33 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+# Engines built for online migrations, keyed by URL so repeated runs in the
+# same process (pytest fixtures, multi-schema runs) reuse pooled connections.
+_engines: dict[str, Engine] = {}
+
+
+def _get_engine() -> Engine:
+    """Build (once per URL) a pooled engine for online migrations."""
+    url = config.get_main_option("sqlalchemy.url")
+    engine = _engines.get(url)
+    if engine is None:
+        engine = engine_from_config(
+            config.get_section(config.config_ini_section),
+            prefix="sqlalchemy.",
+            poolclass=pool.QueuePool,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+            pool_pre_ping=True,
+            pool_use_lifo=True,
+        )
+        _engines[url] = engine
+    return engine
+
+
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    connectable = _get_engine()
 
     with connectable.connect() as connection:
         context.configure(
@@ -62,7 +86,60 @@ def run_migrations_online() -> None:
             context.run_migrations()
 
 
+class _UrlLoggerAdapter(logging.LoggerAdapter):
+    """Prefix log records with the target database so interleaved output stays readable."""
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['url']}] {msg}", kwargs
+
+
+def _migrate_url(url: str) -> None:
+    """Child-process entry point: run the online migration against a single URL."""
+    os.environ["DATABASE_URL"] = url
+    config.set_main_option("sqlalchemy.url", url)
+    log = _UrlLoggerAdapter(
+        logging.getLogger("alembic.env"),
+        {"url": make_url(url).render_as_string(hide_password=True)},
+    )
+    log.info("Running migrations")
+    run_migrations_online()
+    log.info("Migrations complete")
+
+
+def run_migrations_online_parallel(urls: list[str]) -> None:
+    """Run online migrations for several databases, one child process per URL."""
+    # env.py is not importable by module name, so children are forked (which
+    # also hands them the configured Alembic context) rather than pickled into
+    # a pool. Pooled connections must not be shared across the fork.
+    for engine in _engines.values():
+        engine.dispose()
+    _engines.clear()
+
+    mp_context = multiprocessing.get_context("fork")
+    # Deterministic ordering by URL string
+    workers = [
+        (url, mp_context.Process(target=_migrate_url, args=(url,)))
+        for url in sorted(urls)
+    ]
+    for _, worker in workers:
+        worker.start()
+
+    failed = []
+    for url, worker in workers:
+        worker.join()
+        if worker.exitcode != 0:
+            failed.append(make_url(url).render_as_string(hide_password=True))
+
+    if failed:
+        raise RuntimeError(f"Migrations failed for: {', '.join(failed)}")
+
+
+# Multi-tenant deployments list every database in DATABASE_URLS (comma-separated)
+database_urls = [u.strip() for u in os.getenv("DATABASE_URLS", "").split(",") if u.strip()]
+
 if context.is_offline_mode():
     run_migrations_offline()
+elif len(database_urls) > 1:
+    run_migrations_online_parallel(database_urls)
 else:
     run_migrations_online()
@@ -15,8 +15,34 @@ down_revision = None
 branch_labels = None
 depends_on = None
 
+# Connection-level settings for faster local (SQLite) schema creation
+SQLITE_FAST_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    # Nothing references a fresh schema yet, so FK checks are pure overhead.
+    # Must be issued outside a transaction; it only affects this connection.
+    "PRAGMA foreign_keys=OFF",
+)
+
+
+def _is_sqlite_online() -> bool:
+    """True when migrating a live SQLite connection (not rendering offline SQL)."""
+    context = op.get_context()
+    return not context.as_sql and context.dialect.name == "sqlite"
+
 
 def upgrade() -> None:
+    if _is_sqlite_online():
+        bind = op.get_bind()
+        for pragma in SQLITE_FAST_PRAGMAS:
+            bind.exec_driver_sql(pragma)
+        # pysqlite autocommits each DDL statement; open the transaction
+        # explicitly so all tables and indexes are committed (and fsynced)
+        # once, together with the alembic_version row.
+        bind.exec_driver_sql("BEGIN")
+
     # Users
     op.create_table(
         'users',
@@ -134,6 +160,13 @@ def upgrade() -> None:
 
 
 def downgrade() -> None:
+    if _is_sqlite_online():
+        bind = op.get_bind()
+        # Same single transaction as upgrade(); FK checks are deferred to its
+        # commit so the drops do not validate references one table at a time.
+        bind.exec_driver_sql("BEGIN")
+        bind.exec_driver_sql("PRAGMA defer_foreign_keys=ON")
+
     op.drop_table('query_responses')
     op.drop_table('queries')
     op.drop_table('document_chunks')
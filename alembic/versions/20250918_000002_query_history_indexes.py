@@ -0,0 +1,36 @@
+"""
+Query history indexes
+
+Revision ID: 20250918_000002
+Revises: 20250918_000001
+Create Date: 2025-09-18 00:00:02
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20250918_000002'
+down_revision = '20250918_000001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Newest-first history per user, and per user session; built without blocking writes on Postgres
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_queries_user_created', 'queries', ['user_id', sa.text('created_at DESC')],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_queries_user_session_created', 'queries',
+            ['user_id', 'session_id', sa.text('created_at DESC')],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_queries_user_session_created', table_name='queries', postgresql_concurrently=True)
+        op.drop_index('ix_queries_user_created', table_name='queries', postgresql_concurrently=True)
@@ -0,0 +1,32 @@
+"""
+Query type index for analytics
+
+Revision ID: 20250918_000003
+Revises: 20250918_000002
+Create Date: 2025-09-18 00:00:03
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20250918_000003'
+down_revision = '20250918_000002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Per-type counts over a date range; built without blocking writes on Postgres
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_queries_user_type_created', 'queries',
+            ['user_id', 'query_type', sa.text('created_at DESC')],
+            postgresql_include=['id'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_queries_user_type_created', table_name='queries', postgresql_concurrently=True)
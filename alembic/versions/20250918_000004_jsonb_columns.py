@@ -0,0 +1,65 @@
+"""
+JSONB columns and GIN indexes
+
+Revision ID: 20250918_000004
+Revises: 20250918_000003
+Create Date: 2025-09-18 00:00:04
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '20250918_000004'
+down_revision = '20250918_000003'
+branch_labels = None
+depends_on = None
+
+JSON_COLUMNS = [
+    ('documents', 'doc_metadata'),
+    ('documents', 'tags'),
+    ('document_chunks', 'doc_metadata'),
+    ('queries', 'retrieved_documents'),
+    ('queries', 'query_metadata'),
+    ('query_responses', 'context_chunks'),
+    ('query_responses', 'source_attribution'),
+]
+
+
+def upgrade() -> None:
+    # JSONB is Postgres-only; other dialects keep plain JSON
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table, column in JSON_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=postgresql.JSONB(),
+            postgresql_using=f'{column}::jsonb'
+        )
+
+    # Containment (@>) filters on document tags and metadata
+    op.create_index(
+        'ix_documents_tags_gin', 'documents', ['tags'],
+        postgresql_using='gin', postgresql_ops={'tags': 'jsonb_path_ops'}
+    )
+    op.create_index(
+        'ix_documents_metadata_gin', 'documents', ['doc_metadata'],
+        postgresql_using='gin', postgresql_ops={'doc_metadata': 'jsonb_path_ops'}
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_documents_metadata_gin', table_name='documents')
+    op.drop_index('ix_documents_tags_gin', table_name='documents')
+
+    for table, column in JSON_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=sa.JSON(),
+            postgresql_using=f'{column}::json'
+        )
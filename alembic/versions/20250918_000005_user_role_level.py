@@ -0,0 +1,29 @@
+"""
+Numeric user role level
+
+Revision ID: 20250918_000005
+Revises: 20250918_000004
+Create Date: 2025-09-18 00:00:05
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20250918_000005'
+down_revision = '20250918_000004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows start at the user level; admins and viewers are backfilled below
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('role_level', sa.SmallInteger(), nullable=False, server_default='1'))
+    op.execute("UPDATE users SET role_level = 2 WHERE role = 'admin'")
+    op.execute("UPDATE users SET role_level = 0 WHERE role NOT IN ('admin', 'user') OR role IS NULL")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('role_level')
@@ -0,0 +1,34 @@
+"""
+Generated total_tokens column
+
+Revision ID: 20250918_000006
+Revises: 20250918_000005
+Create Date: 2025-09-18 00:00:06
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20250918_000006'
+down_revision = '20250918_000005'
+branch_labels = None
+depends_on = None
+
+TOTAL_TOKENS_EXPR = 'coalesce(input_tokens, 0) + coalesce(output_tokens, 0)'
+
+
+def upgrade() -> None:
+    # The sum is kept by the database on every write, so it can't drift from its parts
+    with op.batch_alter_table('queries') as batch_op:
+        batch_op.drop_column('total_tokens')
+    with op.batch_alter_table('queries') as batch_op:
+        batch_op.add_column(sa.Column('total_tokens', sa.Integer(), sa.Computed(TOTAL_TOKENS_EXPR, persisted=True)))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('queries') as batch_op:
+        batch_op.drop_column('total_tokens')
+    with op.batch_alter_table('queries') as batch_op:
+        batch_op.add_column(sa.Column('total_tokens', sa.Integer(), server_default='0'))
+    op.execute(f'UPDATE queries SET total_tokens = {TOTAL_TOKENS_EXPR}')
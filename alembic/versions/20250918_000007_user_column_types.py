@@ -0,0 +1,54 @@
+"""
+Narrow user password hash and JSONB permissions
+
+Revision ID: 20250918_000007
+Revises: 20250918_000006
+Create Date: 2025-09-18 00:00:07
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '20250918_000007'
+down_revision = '20250918_000006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Column widths and JSONB only matter on Postgres; SQLite ignores both
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.alter_column(
+        'users', 'hashed_password',
+        type_=sa.String(length=60),
+        existing_type=sa.String(length=255),
+        existing_nullable=False
+    )
+    op.alter_column(
+        'users', 'permissions',
+        type_=postgresql.JSONB(),
+        existing_type=sa.Text(),
+        postgresql_using="nullif(permissions, '')::jsonb"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.alter_column(
+        'users', 'permissions',
+        type_=sa.Text(),
+        existing_type=postgresql.JSONB(),
+        postgresql_using='permissions::text'
+    )
+    op.alter_column(
+        'users', 'hashed_password',
+        type_=sa.String(length=255),
+        existing_type=sa.String(length=60),
+        existing_nullable=False
+    )
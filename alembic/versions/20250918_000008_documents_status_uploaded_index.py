@@ -0,0 +1,40 @@
+"""
+Documents listing index by status and upload date
+
+Revision ID: 20250918_000008
+Revises: 20250918_000007
+Create Date: 2025-09-18 00:00:08
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20250918_000008'
+down_revision = '20250918_000007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Status-filtered listing, newest first; replaces (user_id, status), which it prefixes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_documents_user_status_uploaded', 'documents',
+            ['user_id', 'status', sa.text('uploaded_at DESC')],
+            postgresql_concurrently=True
+        )
+        # Absent from databases created before the initial revision declared it
+        op.drop_index(
+            'ix_documents_user_status', table_name='documents',
+            postgresql_concurrently=True, if_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_documents_user_status', 'documents', ['user_id', 'status'],
+            postgresql_concurrently=True
+        )
+        op.drop_index('ix_documents_user_status_uploaded', table_name='documents', postgresql_concurrently=True)
@@ -0,0 +1,44 @@
+"""
+Query history indexes with id as keyset tiebreaker
+
+Revision ID: 20250918_000009
+Revises: 20250918_000008
+Create Date: 2025-09-18 00:00:09
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20250918_000009'
+down_revision = '20250918_000008'
+branch_labels = None
+depends_on = None
+
+# (old name, new name, leading columns) of each newest-first history index
+_INDEXES = (
+    ('ix_queries_user_created', 'ix_queries_user_created_id', ['user_id']),
+    ('ix_queries_user_session_created', 'ix_queries_user_session_created_id', ['user_id', 'session_id']),
+)
+
+
+def upgrade() -> None:
+    # History seeks on (created_at, id); the new indexes replace those they extend
+    with op.get_context().autocommit_block():
+        for old_name, new_name, columns in _INDEXES:
+            op.create_index(
+                new_name, 'queries',
+                [*columns, sa.text('created_at DESC'), sa.text('id DESC')],
+                postgresql_concurrently=True
+            )
+            op.drop_index(old_name, table_name='queries', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for old_name, new_name, columns in _INDEXES:
+            op.create_index(
+                old_name, 'queries', [*columns, sa.text('created_at DESC')],
+                postgresql_concurrently=True
+            )
+            op.drop_index(new_name, table_name='queries', postgresql_concurrently=True)
@@ -0,0 +1,38 @@
+"""
+Document listing and chunk lookup indexes
+
+Revision ID: 20250918_000010
+Revises: 20250918_000009
+Create Date: 2025-09-18 00:00:10
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20250918_000010'
+down_revision = '20250918_000009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Per-user listing by upload date and ordered chunk lookups. Databases created
+    # while the initial revision briefly declared these already have them, and lack
+    # the single-column status index that the composite status indexes replace
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_documents_user_uploaded', 'documents', ['user_id', 'uploaded_at'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_chunks_doc_index', 'document_chunks', ['document_id', 'chunk_index'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index('ix_documents_status', table_name='documents', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_documents_status', 'documents', ['status'], postgresql_concurrently=True)
+        op.drop_index('ix_chunks_doc_index', table_name='document_chunks', postgresql_concurrently=True)
+        op.drop_index('ix_documents_user_uploaded', table_name='documents', postgresql_concurrently=True)
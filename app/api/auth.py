@@ -2,8 +2,13 @@
 Authentication and user management API routes
 """
 import logging
+from datetime import datetime
 from typing import List
-from fastapi import APIRouter, HTTPException, status, Depends
+from uuid import UUID
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPAuthorizationCredentials
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 from app.schemas.auth import (
@@ -14,15 +19,47 @@ from app.dependencies import (
     get_db, get_auth_service,
     get_current_active_user, require_admin_role,
     CurrentUserDep, AdminUserDep, DatabaseDep,
-    AuthServiceDep
+    AuthServiceDep, security
 )
 from app.models.user import User
+from app.database.session import SessionLocal
+from app.services.auth_service import LAST_LOGIN_RESOLUTION
 from app.config import settings
+from app.api.serialization import cached_model_response
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# Token permissions granted per role
+_ROLE_PERMISSIONS = {
+    "admin": ("read", "write", "delete", "manage"),
+    "user": ("read", "write"),
+}
+_DEFAULT_PERMS = ("read",)
+
+# Built once; validates ORM users into UserResponse without per-call setup
+_USER_ADAPTER = TypeAdapter(UserResponse)
+
+
+def _record_login(user_id: UUID, logged_in_at: datetime) -> None:
+    """
+    Write last_login with its own session, after the login response is sent
+    The WHERE clause keeps concurrent logins from rewriting a fresh value
+    """
+    db = SessionLocal()
+    try:
+        db.query(User).filter(
+            User.id == user_id,
+            (User.last_login.is_(None)) | (User.last_login < logged_in_at - LAST_LOGIN_RESOLUTION)
+        ).update({User.last_login: logged_in_at}, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error("Failed to record login for %s: %s", user_id, e)
+    finally:
+        db.close()
+
 
 @router.post("/signup", response_model=UserSignupResponse)
 async def user_signup(
@@ -35,7 +72,8 @@ async def user_signup(
     """
     try:
         # Create user
-        user = auth_service.create_user(
+        user = await run_in_threadpool(
+            auth_service.create_user,
             db=db,
             email=signup_data.email,
             username=signup_data.username,
@@ -50,14 +88,14 @@ async def user_signup(
             user_id=str(user.id),
             email=user.email,
             role=user.role,
-            permissions=["read", "write"]
+            permissions=_ROLE_PERMISSIONS["user"]
         )
         
-        logger.info(f"User signup completed: {signup_data.email}")
+        logger.info("User signup completed: %s", signup_data.email)
         
         return UserSignupResponse(
             message="User created successfully",
-            user=UserResponse.model_validate(user),
+            user=_USER_ADAPTER.validate_python(user, from_attributes=True),
             access_token=access_token,
             token_type="bearer",
             expires_in=settings.jwt_expire_minutes * 60
@@ -66,7 +104,7 @@ async def user_signup(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"User signup failed: {e}")
+        logger.error("User signup failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Signup failed"
@@ -78,6 +116,7 @@ async def user_signup(
 @router.post("/login", response_model=TokenResponse)
 async def login_user(
     login_data: UserLogin,
+    background_tasks: BackgroundTasks,
     db: DatabaseDep,
     auth_service: AuthServiceDep
 ):
@@ -86,7 +125,8 @@ async def login_user(
     """
     try:
         # Authenticate user
-        user = auth_service.authenticate_user(
+        user = await run_in_threadpool(
+            auth_service.authenticate_user,
             db=db,
             email=login_data.email,
             password=login_data.password
@@ -98,14 +138,12 @@ async def login_user(
                 detail="Invalid credentials"
             )
         
+        now = datetime.utcnow()
+        if auth_service.login_due(user, now):
+            background_tasks.add_task(_record_login, user.id, now)
+        
         # Get user permissions (could be extended based on role)
-        permissions = []
-        if user.role == "admin":
-            permissions = ["read", "write", "delete", "manage"]
-        elif user.role == "user":
-            permissions = ["read", "write"]
-        else:
-            permissions = ["read"]
+        permissions = _ROLE_PERMISSIONS.get(user.role, _DEFAULT_PERMS)
         
         # Create access token
         access_token = auth_service.create_access_token(
@@ -115,19 +153,19 @@ async def login_user(
             permissions=permissions
         )
         
-        logger.info(f"User logged in: {user.email}")
+        logger.info("User logged in: %s", user.email)
         
         return TokenResponse(
             access_token=access_token,
             token_type="bearer",
             expires_in=settings.jwt_expire_minutes * 60,
-            user=UserResponse.model_validate(user)
+            user=_USER_ADAPTER.validate_python(user, from_attributes=True)
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Login failed: {e}")
+        logger.error("Login failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Login failed"
@@ -141,7 +179,7 @@ async def get_current_user_info(
     """
     Get current authenticated user information
     """
-    return current_user
+    return cached_model_response(UserResponse, current_user)
 
 
 
@@ -167,13 +205,7 @@ async def refresh_token(
     """
     try:
         # Get user permissions
-        permissions = []
-        if current_user.role == "admin":
-            permissions = ["read", "write", "delete", "manage"]
-        elif current_user.role == "user":
-            permissions = ["read", "write"]
-        else:
-            permissions = ["read"]
+        permissions = _ROLE_PERMISSIONS.get(current_user.role, _DEFAULT_PERMS)
         
         # Create new access token
         access_token = auth_service.create_access_token(
@@ -187,12 +219,31 @@ async def refresh_token(
             access_token=access_token,
             token_type="bearer",
             expires_in=settings.jwt_expire_minutes * 60,
-            user=UserResponse.model_validate(current_user)
+            user=_USER_ADAPTER.validate_python(current_user, from_attributes=True)
         )
         
     except Exception as e:
-        logger.error(f"Token refresh failed: {e}")
+        logger.error("Token refresh failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Token refresh failed"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/logout")
+async def logout(
+    current_user: CurrentUserDep,
+    auth_service: AuthServiceDep,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Revoke the current token
+    It is rejected on every worker until it expires; 503 if the denylist is unavailable
+    """
+    if not await run_in_threadpool(auth_service.revoke_token, credentials.credentials):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Logout is temporarily unavailable"
+        )
+    logger.info("User logged out: %s", current_user.email)
+    return {"message": "Logged out successfully"}
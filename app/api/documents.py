@@ -2,10 +2,16 @@
 Document management API routes
 """
 import logging
+import time
+from pathlib import Path
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form, BackgroundTasks
+from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form, BackgroundTasks, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-import json
+import orjson
 
 from app.schemas.document import (
     DocumentResponse, DocumentUpload, DocumentList,
@@ -14,14 +20,18 @@ from app.schemas.document import (
 )
 from app.dependencies import (
     CurrentUserDep, DatabaseDep,
-    DocumentServiceDep, VectorServiceDep
+    DocumentServiceDep, VectorServiceDep, EmbeddingServiceDep
 )
-from app.models.document import Document, DocumentChunk
+from app.models.document import DocumentChunk
+from app.api.serialization import cached_model_response
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
+# Built once; validates ORM documents into DocumentResponse lists
+_DOCUMENT_LIST_ADAPTER = TypeAdapter(List[DocumentResponse])
+
 
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
@@ -34,42 +44,51 @@ async def upload_document(
 ):
     """
     Upload a document for the current user
+    The file is streamed to disk in bounded chunks; uploads larger than
+    MAX_FILE_SIZE_MB are rejected with 413 as soon as the limit is crossed
     """
     try:
         # Parse metadata if provided
-        parsed_metadata = {}
-        if metadata:
-            try:
-                parsed_metadata = json.loads(metadata)
-            except json.JSONDecodeError:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid metadata JSON format"
-                )
+        try:
+            parsed_metadata = orjson.loads(metadata) if metadata else {}
+        except orjson.JSONDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid metadata JSON format"
+            )
         
         # Upload document
         document = await document_service.upload_document(
             db=db,
-            user_id=str(current_user.id),
+            user_id=current_user.id_str,
             file=file,
             metadata=parsed_metadata
         )
         
+        # Commit once for the upload; processing is scheduled only after it lands
+        file_path = document.file_path
+        try:
+            await run_in_threadpool(db.commit)
+        except Exception:
+            await run_in_threadpool(db.rollback)
+            Path(file_path).unlink(missing_ok=True)
+            raise
+        
         # Schedule background processing
         background_tasks.add_task(
             document_service.process_document,
             db=db,
-            document_id=str(document.id),
-            user_id=str(current_user.id)
+            document_id=document.id_str,
+            user_id=current_user.id_str
         )
         
-        logger.info(f"Document uploaded: {document.id} by {current_user.email}")
+        logger.info("Document uploaded: %s by %s", document.id, current_user.email)
         return document
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Document upload failed: {e}")
+        logger.error("Document upload failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Document upload failed"
@@ -83,36 +102,34 @@ async def list_documents(
     document_service: DocumentServiceDep,
     skip: int = 0,
     limit: int = 100,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    with_total: bool = False
 ):
     """
     List documents for the current user
+    The total is counted on the first page only unless with_total is set
     """
     try:
-        documents = document_service.list_documents(
+        documents, total = await run_in_threadpool(
+            document_service.list_documents,
             db=db,
-            user_id=str(current_user.id),
+            user_id=current_user.id_str,
             skip=skip,
             limit=limit,
-            status_filter=status
+            status_filter=status,
+            with_total=with_total or skip == 0
         )
         
-        # Get total count for pagination
-        total_query = db.query(Document).filter(Document.user_id == current_user.id)
-        if status:
-            total_query = total_query.filter(Document.status == status)
-        total = total_query.count()
-        
         return DocumentList(
-            documents=documents,
+            documents=_DOCUMENT_LIST_ADAPTER.validate_python(documents, from_attributes=True),
             total=total,
             page=skip // limit + 1,
             size=limit,
-            pages=(total + limit - 1) // limit
+            pages=(total + limit - 1) // limit if total is not None else None
         )
         
     except Exception as e:
-        logger.error(f"Failed to list documents: {e}")
+        logger.error("Failed to list documents: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to list documents"
@@ -130,10 +147,11 @@ async def get_document(
     Get a specific document by ID
     """
     try:
-        document = document_service.get_document(
+        document = await run_in_threadpool(
+            document_service.get_document,
             db=db,
             document_id=document_id,
-            user_id=str(current_user.id)
+            user_id=current_user.id_str
         )
         
         if not document:
@@ -142,12 +160,12 @@ async def get_document(
                 detail="Document not found"
             )
         
-        return document
+        return cached_model_response(DocumentResponse, document)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to get document: {e}")
+        logger.error("Failed to get document: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get document"
@@ -168,10 +186,11 @@ async def process_document(
     """
     try:
         # Validate document exists and belongs to user
-        document = document_service.get_document(
+        document = await run_in_threadpool(
+            document_service.get_document,
             db=db,
             document_id=document_id,
-            user_id=str(current_user.id)
+            user_id=current_user.id_str
         )
         
         if not document:
@@ -193,7 +212,7 @@ async def process_document(
             document_service.process_document,
             db=db,
             document_id=document_id,
-            user_id=str(current_user.id)
+            user_id=current_user.id_str
         )
         
         return DocumentProcessResponse(
@@ -205,7 +224,7 @@ async def process_document(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to process document: {e}")
+        logger.error("Failed to process document: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process document"
@@ -226,7 +245,7 @@ async def delete_document(
         success = await document_service.delete_document(
             db=db,
             document_id=document_id,
-            user_id=str(current_user.id)
+            user_id=current_user.id_str
         )
         
         if not success:
@@ -235,13 +254,13 @@ async def delete_document(
                 detail="Document not found"
             )
         
-        logger.info(f"Document deleted: {document_id} by {current_user.email}")
+        logger.info("Document deleted: %s by %s", document_id, current_user.email)
         return {"message": "Document deleted successfully"}
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to delete document: {e}")
+        logger.error("Failed to delete document: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete document"
@@ -251,21 +270,44 @@ async def delete_document(
 @router.get("/{document_id}/chunks", response_model=List[DocumentChunkResponse])
 async def get_document_chunks(
     document_id: str,
+    response: Response,
     current_user: CurrentUserDep,
     db: DatabaseDep,
     document_service: DocumentServiceDep,
-    skip: int = 0,
-    limit: int = 50
+    after_chunk_index: Optional[int] = None,
+    limit: int = 50,
+    fields: Optional[str] = None
 ):
     """
-    Get chunks for a specific document
+    Get chunks for a specific document, ordered by chunk index
+    Keyset-paginated: pass the X-Next-Cursor header value as after_chunk_index
+    Pass fields (comma-separated) to select only those columns
     """
     try:
+        # Validate requested projection before touching the database
+        columns = None
+        if fields:
+            requested = {name.strip() for name in fields.split(",") if name.strip()}
+            unknown = requested - DocumentChunkResponse.model_fields.keys()
+            if unknown:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unknown chunk fields: {', '.join(sorted(unknown))}"
+                )
+            # chunk_index is always selected so the cursor can be derived
+            requested.add("chunk_index")
+            columns = [
+                getattr(DocumentChunk, name)
+                for name in DocumentChunkResponse.model_fields
+                if name in requested
+            ]
+        
         # Validate document exists and belongs to user
-        document = document_service.get_document(
+        document = await run_in_threadpool(
+            document_service.get_document,
             db=db,
             document_id=document_id,
-            user_id=str(current_user.id)
+            user_id=current_user.id_str
         )
         
         if not document:
@@ -274,57 +316,78 @@ async def get_document_chunks(
                 detail="Document not found"
             )
         
-        # Get chunks
-        chunks = db.query(DocumentChunk).filter(
-            DocumentChunk.document_id == document_id
-        ).offset(skip).limit(limit).all()
+        # Get chunks (seek on the (document_id, chunk_index) index instead of OFFSET)
+        conditions = [DocumentChunk.document_id == document.id]
+        if after_chunk_index is not None:
+            conditions.append(DocumentChunk.chunk_index > after_chunk_index)
+        
+        if columns is not None:
+            # Projection: plain rows straight to JSON, no ORM objects or Pydantic
+            stmt = (
+                select(*columns).where(*conditions)
+                .order_by(DocumentChunk.chunk_index).limit(limit)
+            )
+            rows = await run_in_threadpool(lambda: db.execute(stmt).mappings().all())
+            headers = {}
+            if rows and len(rows) == limit:
+                headers["X-Next-Cursor"] = str(rows[-1]["chunk_index"])
+            return ORJSONResponse(content=[dict(row) for row in rows], headers=headers)
+        
+        chunks = await run_in_threadpool(
+            lambda: db.query(DocumentChunk).filter(*conditions).order_by(
+                DocumentChunk.chunk_index
+            ).limit(limit).all()
+        )
+        
+        # A full page means there may be more chunks after the last one returned
+        if chunks and len(chunks) == limit:
+            response.headers["X-Next-Cursor"] = str(chunks[-1].chunk_index)
         
         return chunks
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Failed to get document chunks: {e}")
+        logger.error("Failed to get document chunks: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get document chunks"
         )
 
 
-@router.post("/search", response_model=DocumentSearchResponse)
+@router.post("/search", response_model=DocumentSearchResponse, response_class=ORJSONResponse)
 async def search_documents(
     search_request: DocumentSearchRequest,
     current_user: CurrentUserDep,
     db: DatabaseDep,
     vector_service: VectorServiceDep,
-    embedding_service = None  # Will use dependency injection when we have it
+    embedding_service: EmbeddingServiceDep
 ):
     """
     Search documents using vector similarity
     """
     try:
-        # Import embedding service here to avoid circular imports
-        from app.services.embedding_service import EmbeddingService
-        embedding_service = EmbeddingService()
+        started_ns = time.perf_counter_ns()
         
-        # Generate query embedding
-        query_embedding = await embedding_service.embed_text(search_request.query)
+        # Generate query embedding (cached per normalized query)
+        query_embedding = await embedding_service.embed_query(search_request.query)
+        embedded_ns = time.perf_counter_ns()
         
-        # Build filter conditions
+        # Restrict to the requested documents inside Qdrant (user isolation is
+        # always applied by the vector service)
         filter_conditions = {}
         if search_request.document_ids:
-            # Note: This would need custom implementation in vector service
-            # for filtering by document IDs
-            pass
+            filter_conditions["document_id"] = [str(doc_id) for doc_id in search_request.document_ids]
         
         # Search in vector store
         search_results = await vector_service.search_documents(
-            user_id=str(current_user.id),
+            user_id=current_user.id_str,
             query_embedding=query_embedding,
             limit=search_request.limit,
             score_threshold=search_request.score_threshold,
             filter_conditions=filter_conditions
         )
+        searched_ns = time.perf_counter_ns()
         
         # Format results
         formatted_results = [
@@ -340,16 +403,26 @@ async def search_documents(
             }
             for result in search_results
         ]
+        finished_ns = time.perf_counter_ns()
+        
+        timings = None
+        if search_request.debug:
+            timings = {
+                "embed_ms": (embedded_ns - started_ns) / 1e6,
+                "search_ms": (searched_ns - embedded_ns) / 1e6,
+                "format_ms": (finished_ns - searched_ns) / 1e6,
+            }
         
         return DocumentSearchResponse(
             query=search_request.query,
             results=formatted_results,
             total_found=len(search_results),
-            search_time_ms=0.0  # Would be calculated in real implementation
+            search_time_ms=(finished_ns - started_ns) / 1e6,
+            timings=timings
         )
         
     except Exception as e:
-        logger.error(f"Document search failed: {e}")
+        logger.error("Document search failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Document search failed"
@@ -1,15 +1,19 @@
 """
 Query and RAG API routes
 """
+import asyncio
+import io
 import logging
-import hashlib
-import json
 import time
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
 from fastapi import APIRouter, HTTPException, status, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm import Session
-from uuid import uuid4
+from uuid import UUID, uuid4
 
 from app.schemas.query import (
     QueryRequest, QueryResponse, QueryHistory, QueryFeedback,
@@ -17,15 +21,63 @@ from app.schemas.query import (
 )
 from app.dependencies import (
     CurrentUserDep, DatabaseDep,
-    VectorServiceDep, LLMServiceDep, EmbeddingServiceDep, CacheServiceDep
+    VectorServiceDep, LLMServiceDep, EmbeddingBatcherDep, CacheServiceDep
 )
 from app.models.query import Query, QueryResponse as QueryResponseModel
 from app.database.session import SessionLocal
+from app.config import settings
+from app.services.cache_service import hash_key
+from app.services.llm_service import count_tokens
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 router = APIRouter(prefix="/queries", tags=["Queries & RAG"])
 
+# Work currently running for a cache key, shared by identical concurrent requests
+_inflight: Dict[str, asyncio.Future] = {}
+
+# How long a query with no matches at any threshold skips the vector store
+EMPTY_SEARCH_TTL_SECONDS = 60
+
+# How long a complete RAG answer is reused for an identical request; kept short
+# so newly uploaded or deleted documents show up in answers soon after
+RAG_RESPONSE_TTL_SECONDS = 300
+
+
+async def _singleflight(key: str, work: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run work once per key at a time within this process;
+    callers arriving while it runs await the same result
+    """
+    future = _inflight.get(key)
+    if future is not None:
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+        # The first caller was cancelled; do the work ourselves
+        return await work()
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await work()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+        future.exception()  # mark retrieved when nobody else was waiting
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        _inflight.pop(key, None)
+
 
 @router.get("/debug/vector-status")
 async def debug_vector_status(
@@ -39,12 +91,7 @@ async def debug_vector_status(
         # Check collection status
         collection_exists = await vector_service.init_collection()
         
-        # Get collection info
-        from qdrant_client.http import models
-        # Use default collection from vector service
-        collection_info = await vector_service.async_client.get_collection(vector_service.default_collection)
-        
-        # Count documents for this user
+        # Count vectors for this user
         from qdrant_client.http.models import Filter, FieldCondition, MatchValue
         search_filter = Filter(
             must=[
@@ -55,13 +102,22 @@ async def debug_vector_status(
             ]
         )
         
-        # Get document count
-        scroll_result = await vector_service.async_client.scroll(
-            collection_name=vector_service.default_collection,
-            scroll_filter=search_filter,
-            limit=1000,
-            with_payload=True,
-            with_vectors=False
+        # Collection info, an approximate count and a 5-point sample with only the
+        # displayed payload fields, fetched concurrently
+        collection_info, count_result, scroll_result = await asyncio.gather(
+            vector_service.async_client.get_collection(vector_service.default_collection),
+            vector_service.async_client.count(
+                collection_name=vector_service.default_collection,
+                count_filter=search_filter,
+                exact=False
+            ),
+            vector_service.async_client.scroll(
+                collection_name=vector_service.default_collection,
+                scroll_filter=search_filter,
+                limit=5,
+                with_payload=["document_id", "source"],
+                with_vectors=False
+            )
         )
         
         documents = scroll_result[0] if scroll_result else []
@@ -69,7 +125,7 @@ async def debug_vector_status(
         return {
             "collection_exists": collection_exists,
             "total_vectors": collection_info.vectors_count,
-            "user_documents": len(documents),
+            "user_documents": count_result.count,
             "user_id": str(current_user.id),
             "sample_documents": [
                 {
@@ -77,7 +133,7 @@ async def debug_vector_status(
                     "document_id": doc.payload.get("document_id"),
                     "source": doc.payload.get("source", "")[:50] + "..." if doc.payload.get("source") else None
                 }
-                for doc in documents[:5]  # Show first 5 documents
+                for doc in documents
             ]
         }
         
@@ -97,7 +153,7 @@ async def debug_search_test(
     score_threshold: float = 0.3,
     current_user: CurrentUserDep = None,
     vector_service: VectorServiceDep = None,
-    embedding_service: EmbeddingServiceDep = None,
+    embedding_batcher: EmbeddingBatcherDep = None,
     cache: CacheServiceDep = None
 ):
     """
@@ -105,11 +161,11 @@ async def debug_search_test(
     """
     try:
         # Generate embedding for the query
-        query_embedding = await embedding_service.embed_text(query)
+        query_embedding = await embedding_batcher.embed(query)
         
         # Stable, per-user cache key
         q_norm = (query or "").strip()
-        q_hash = hashlib.sha256(q_norm.encode("utf-8")).hexdigest()
+        q_hash = hash_key(q_norm)
         cache_key = f"search:user:{current_user.id}:{q_hash}:{max_chunks}:{score_threshold}"
         cached = cache.get_json(cache_key)
         if cached is not None:
@@ -146,14 +202,126 @@ async def debug_search_test(
         }
 
 
+def _rag_query_metadata(
+    rag_request: RAGRequest,
+    llm_provider: str,
+    llm_model: str,
+    score_threshold: Optional[float]
+) -> Dict[str, Any]:
+    """Small query_metadata for RAG rows; the full request only when DEBUG_AUDIT is on"""
+    metadata = {
+        "llm_provider": llm_provider,
+        "llm_model": llm_model,
+        "max_chunks": rag_request.max_chunks,
+        "temperature": rag_request.temperature,
+        "score_threshold": score_threshold
+    }
+    if settings.debug_audit:
+        metadata["rag_request"] = rag_request.model_dump(mode='json')
+    return metadata
+
+
+def _persist_rag(
+    query_id: UUID,
+    created_at: datetime,
+    user_id: UUID,
+    query_text: str,
+    similarity_threshold: Optional[float],
+    session_id: Optional[str],
+    conversation_turn: int,
+    query_metadata: Dict[str, Any],
+    processing_time_ms: float,
+    llm_provider: str,
+    llm_model: str,
+    response_text: str,
+    usage: Dict[str, Any],
+    context_used: str,
+    context_chunks: List[str],
+    retrieved_documents: List[str],
+    source_attribution: List[str],
+    is_cached: bool = False
+) -> None:
+    """
+    Write the Query and QueryResponse rows for a completed RAG request
+    Runs as a background task with its own session, after the response is sent
+    """
+    db = SessionLocal()
+    try:
+        # Create query record
+        query_record = Query(
+            id=query_id,
+            user_id=user_id,
+            query_text=query_text,
+            query_type="rag",
+            processing_time_ms=processing_time_ms,
+            status="completed",
+            retrieved_chunks_count=len(context_chunks),
+            retrieved_documents=retrieved_documents,
+            similarity_threshold=similarity_threshold,
+            llm_provider=llm_provider,
+            llm_model=llm_model,
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            estimated_cost=0.0,  # Would calculate based on provider pricing
+            session_id=session_id,
+            conversation_turn=conversation_turn,
+            query_metadata=query_metadata,
+            created_at=created_at
+        )
+        
+        # Create response record; the relationship inserts it with the query in one commit
+        query_record.response = QueryResponseModel(
+            response_text=response_text,
+            response_format="text",
+            context_used=context_used,
+            context_chunks=context_chunks,
+            confidence_score=None,  # Could be calculated based on retrieval scores
+            source_attribution=source_attribution,
+            contains_citations=False,  # Could be analyzed
+            fact_checked=False,
+            is_cached=is_cached,
+            cache_hit=is_cached
+        )
+        
+        db.add(query_record)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to persist RAG query {query_id}: {e}")
+    finally:
+        db.close()
+
+
+def _record_failed_rag(
+    user_id: UUID,
+    rag_request: Dict[str, Any],
+    processing_time_ms: float,
+    error: str
+) -> None:
+    """Store a failed RAG query with its own session"""
+    db = SessionLocal()
+    try:
+        db.add(Query(
+            user_id=user_id,
+            query_text=rag_request["query"],
+            query_type="rag",
+            processing_time_ms=processing_time_ms,
+            status="failed",
+            query_metadata={"error": error, "rag_request": rag_request}
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
 @router.post("/rag", response_model=RAGResponse)
 async def generate_rag_response(
     rag_request: RAGRequest,
+    background_tasks: BackgroundTasks,
     current_user: CurrentUserDep,
-    db: DatabaseDep,
     vector_service: VectorServiceDep,
     llm_service: LLMServiceDep,
-    embedding_service: EmbeddingServiceDep,
+    embedding_batcher: EmbeddingBatcherDep,
     cache: CacheServiceDep
 ):
     """
@@ -163,80 +331,14 @@ async def generate_rag_response(
     
     try:
         start_time = time.time()
-        # Generate query embedding
-        query_embedding = await embedding_service.embed_text(rag_request.query)
-        try:
-            emb_len = len(query_embedding) if isinstance(query_embedding, list) else 0
-        except Exception:
-            emb_len = 0
-        logger.info(f"RAG: generated query embedding length={emb_len}")
-        
-        # Build filter conditions for document retrieval
-        filter_conditions = {}
-        if rag_request.document_ids:
-            # Convert UUIDs to strings for filtering
-            filter_conditions["document_id"] = [str(doc_id) for doc_id in rag_request.document_ids]
-        
-        # Retrieve relevant documents from vector store with cache + auto-relax threshold
-        base_threshold = rag_request.score_threshold if rag_request.score_threshold is not None else 0.3
-        thresholds_to_try = [base_threshold]
-        if base_threshold > 0.0:
-            thresholds_to_try.append(0.1)
-            thresholds_to_try.append(0.0)
-        
-        search_results = []
-        chosen_threshold = base_threshold
         rq_norm = (rag_request.query or "").strip()
-        rq_hash = hashlib.sha256(rq_norm.encode("utf-8")).hexdigest()
-        filt_key = (
-            json.dumps(rag_request.document_ids and [str(d) for d in rag_request.document_ids] or [], sort_keys=True)
-            if rag_request.document_ids else "none"
-        )
-        for thr in thresholds_to_try:
-            cache_key = f"search:user:{current_user.id}:{rq_hash}:{rag_request.max_chunks}:{thr}:{filt_key}"
-            cached = cache.get_json(cache_key)
-            if cached is not None:
-                search_results = cached
-                chosen_threshold = thr
-                logger.info(f"RAG search cache hit: user={current_user.id} thr={thr} results={len(search_results)}")
-            else:
-                # Perform search
-                search_results = await vector_service.search_documents(
-                    user_id=str(current_user.id),
-                    query_embedding=query_embedding,
-                    limit=rag_request.max_chunks,
-                    score_threshold=thr,
-                    filter_conditions=filter_conditions
-                )
-                cache.set_json(cache_key, search_results, ttl_seconds=120)
-                logger.info(f"RAG search cache miss: set user={current_user.id} thr={thr} results={len(search_results)}")
-                chosen_threshold = thr
-            logger.info(f"RAG: retrieved {len(search_results) if search_results else 0} chunks for user={current_user.id} at threshold={thr}")
-            if search_results:
-                break
-        if not search_results and base_threshold > 0.0:
-            logger.info(f"RAG: no chunks found even after relaxing threshold for user={current_user.id}")
-        
-        # Format context documents
-        context_documents = []
-        context_text_parts = []
-        
-        for result in search_results:
-            context_doc = ContextDocument(
-                chunk_id=str(result["id"]) if result["id"] else str(uuid4()),
-                document_id=str(result["document_id"]) if result["document_id"] else str(uuid4()),
-                score=result["score"],
-                text=result["text"],
-                source=result.get("source") or result.get("metadata", {}).get("filename") or "Unknown",
-                page_number=result.get("page_number"),
-                chunk_index=result["chunk_index"],
-                doc_metadata=result["metadata"]
-            )
-            context_documents.append(context_doc)
-            context_text_parts.append(result["text"])
-        
-        # Prepare context for LLM
-        context_used = "\n\n".join(context_text_parts)
+        rq_hash = hash_key(rq_norm)
+        base_threshold = rag_request.score_threshold if rag_request.score_threshold is not None else 0.3
+        # Canonical document filter: the same ids in any order share cache entries
+        doc_ids = tuple(sorted({str(doc_id) for doc_id in rag_request.document_ids or ()}))
+        filt_key = ",".join(doc_ids) or "none"
+        search_key_prefix = f"search:user:{current_user.id}:{rq_hash}:{rag_request.max_chunks}"
+        empty_key = f"search:empty:user:{current_user.id}:{rq_hash}:{filt_key}"
         
         # Use user's LLM configuration if not specified
         # Note: current_user has llm_provider/llm_model in per-user mode
@@ -244,98 +346,211 @@ async def generate_rag_response(
         llm_model = rag_request.llm_model or getattr(current_user, "llm_model", None) or "claude-3-5-sonnet-20241022"
         logger.info(f"RAG: using provider={llm_provider}, model={llm_model}")
         
-        # Cache-aware LLM response
-        context_ids = ",".join([str(doc.chunk_id) for doc in context_documents]) if context_documents else "none"
-        llm_cache_key = f"llm:user:{current_user.id}:{llm_provider}:{llm_model}:{rq_hash}:{context_ids}:{chosen_threshold}:{rag_request.max_tokens}:{rag_request.temperature}"
-        llm_cached = cache.get_json(llm_cache_key)
-        if llm_cached is not None:
-            logger.info(f"LLM cache hit: user={current_user.id} model={llm_model}")
-            class Resp:  # lightweight adapter
-                def __init__(self, data):
-                    self.content = data.get("content", "")
-                    self.usage = data.get("usage", {})
-            llm_response = Resp(llm_cached)
+        # Whole-answer cache: a repeat of the same request skips retrieval and generation
+        answer_key = (
+            f"rag:user:{current_user.id}:{rq_hash}:{filt_key}:{rag_request.max_chunks}:{base_threshold}:"
+            f"{llm_provider}:{llm_model}:{rag_request.max_tokens}:{rag_request.temperature}:"
+            f"{hash_key(rag_request.system_prompt or '')}"
+        )
+        answer = cache.get_json(answer_key)
+        is_cached = answer is not None
+        if is_cached:
+            logger.info(f"RAG response cache hit: user={current_user.id}")
         else:
-            # Generate LLM response
-            llm_response = await llm_service.generate_rag_response(
-                query=rag_request.query,
-                context_documents=[doc.dict() for doc in context_documents],
-                provider=llm_provider,
-                model=llm_model,
-                system_prompt=rag_request.system_prompt,
-                temperature=rag_request.temperature,
-                max_tokens=rag_request.max_tokens,
-                stream=False  # Non-streaming for this endpoint
+            async def retrieve():
+                # Build filter conditions for document retrieval
+                filter_conditions = {}
+                if doc_ids:
+                    filter_conditions["document_id"] = list(doc_ids)
+        
+                # Retrieve relevant documents from vector store with cache + auto-relax threshold
+                thresholds_to_try = [base_threshold]
+                if base_threshold > 0.0:
+                    thresholds_to_try.append(0.1)
+                    thresholds_to_try.append(0.0)
+        
+                cache_keys = [f"{search_key_prefix}:{thr}:{filt_key}" for thr in thresholds_to_try]
+            
+                # Probe the no-match sentinel and every threshold's cache entry in one round-trip
+                known_empty, *results = cache.mget_json([empty_key] + cache_keys)
+                if known_empty:
+                    logger.info(f"RAG search negative cache hit: user={current_user.id}")
+                    return [], thresholds_to_try[-1]
+            
+                # Thresholds up to the first cached hit decide the answer; search the uncached ones among them at once
+                cutoff = next((i for i, cached in enumerate(results) if cached), len(thresholds_to_try) - 1)
+                pending = [i for i in range(cutoff + 1) if results[i] is None]
+                for i in range(cutoff + 1):
+                    if results[i] is not None:
+                        logger.info(f"RAG search cache hit: user={current_user.id} thr={thresholds_to_try[i]} results={len(results[i])}")
+            
+                if pending:
+                    # Generate query embedding (only needed when something has to be searched)
+                    query_embedding = await embedding_batcher.embed(rag_request.query)
+                    try:
+                        emb_len = len(query_embedding) if isinstance(query_embedding, list) else 0
+                    except Exception:
+                        emb_len = 0
+                    logger.info(f"RAG: generated query embedding length={emb_len}")
+                
+                    fanned_out = await asyncio.gather(*(
+                        vector_service.search_documents(
+                            user_id=str(current_user.id),
+                            query_embedding=query_embedding,
+                            limit=rag_request.max_chunks,
+                            score_threshold=thresholds_to_try[i],
+                            filter_conditions=filter_conditions
+                        )
+                        for i in pending
+                    ))
+                    for i, searched in zip(pending, fanned_out):
+                        results[i] = searched
+                        logger.info(f"RAG search cache miss: set user={current_user.id} thr={thresholds_to_try[i]} results={len(searched)}")
+                    cache.mset_json({cache_keys[i]: results[i] for i in pending}, ttl_seconds=120)
+            
+                # Highest threshold that returned anything wins
+                for i in range(cutoff + 1):
+                    if results[i]:
+                        return results[i], thresholds_to_try[i]
+            
+                # Nothing even at threshold 0.0: remember that for any threshold or chunk limit
+                cache.set_json(empty_key, True, ttl_seconds=EMPTY_SEARCH_TTL_SECONDS)
+                return [], thresholds_to_try[-1]
+        
+            # Identical concurrent requests share one embedding + vector search
+            search_results, chosen_threshold = await _singleflight(
+                f"{search_key_prefix}:{base_threshold}:{filt_key}",
+                retrieve
             )
-            cache.set_json(llm_cache_key, {"content": llm_response.content, "usage": llm_response.usage}, ttl_seconds=300)
-            logger.info(f"LLM cache miss: set user={current_user.id} model={llm_model}")
+            if not search_results and base_threshold > 0.0:
+                logger.info(f"RAG: no chunks found even after relaxing threshold for user={current_user.id}")
+        
+            # Format context documents once as plain dicts for the LLM prompt, collecting the
+            # per-chunk fields persisted and cached below
+            context_payload = []
+            context_text_parts = []
+            chunk_ids = []
+            document_ids = []
+            sources = []
+        
+            for result in search_results:
+                doc = {
+                    "chunk_id": str(result["id"]) if result["id"] else str(uuid4()),
+                    "document_id": str(result["document_id"]) if result["document_id"] else str(uuid4()),
+                    "score": result["score"],
+                    "text": result["text"],
+                    "source": result.get("source") or result.get("metadata", {}).get("filename") or "Unknown",
+                    "page_number": result.get("page_number"),
+                    "chunk_index": result["chunk_index"],
+                    "doc_metadata": result["metadata"]
+                }
+                context_payload.append(doc)
+                context_text_parts.append(doc["text"])
+                chunk_ids.append(doc["chunk_id"])
+                document_ids.append(doc["document_id"])
+                sources.append(doc["source"])
+        
+            # Prepare context for LLM
+            context_used = "\n\n".join(context_text_parts)
+        
+            # Cache-aware LLM response
+            context_ids = ",".join(chunk_ids) or "none"
+            llm_cache_key = f"llm:user:{current_user.id}:{llm_provider}:{llm_model}:{rq_hash}:{context_ids}:{chosen_threshold}:{rag_request.max_tokens}:{rag_request.temperature}"
+            llm_cached = cache.get_json(llm_cache_key)
+            if llm_cached is not None:
+                logger.info(f"LLM cache hit: user={current_user.id} model={llm_model}")
+                class Resp:  # lightweight adapter
+                    def __init__(self, data):
+                        self.content = data.get("content", "")
+                        self.usage = data.get("usage", {})
+                llm_response = Resp(llm_cached)
+            else:
+                async def generate():
+                    # Generate LLM response
+                    response = await llm_service.generate_rag_response(
+                        query=rag_request.query,
+                        context_documents=context_payload,
+                        provider=llm_provider,
+                        model=llm_model,
+                        system_prompt=rag_request.system_prompt,
+                        temperature=rag_request.temperature,
+                        max_tokens=rag_request.max_tokens,
+                        stream=False  # Non-streaming for this endpoint
+                    )
+                    cache.set_json(llm_cache_key, {"content": response.content, "usage": response.usage}, ttl_seconds=300)
+                    logger.info(f"LLM cache miss: set user={current_user.id} model={llm_model}")
+                    return response
+            
+                # Concurrent duplicates wait for the first caller's LLM call
+                llm_response = await _singleflight(llm_cache_key, generate)
+            
+            answer = {
+                "response": llm_response.content,
+                "usage": llm_response.usage,
+                "context_documents": context_payload,
+                "context_used": context_used,
+                "chunk_ids": chunk_ids,
+                "document_ids": document_ids,
+                "sources": sources,
+                "threshold": chosen_threshold
+            }
+            cache.set_json(answer_key, answer, ttl_seconds=RAG_RESPONSE_TTL_SECONDS)
+        
+        usage = answer["usage"]
+        sources = answer["sources"]
+        # Response DTOs from the same dicts; the values are already the schema's types
+        context_documents = [ContextDocument.model_construct(**doc) for doc in answer["context_documents"]]
         
         processing_time = (time.time() - start_time) * 1000
         
-        # Create query record
-        query_record = Query(
+        # Persist after the response is sent; the id and timestamp are fixed up front
+        query_id = uuid4()
+        created_at = datetime.utcnow()
+        background_tasks.add_task(
+            _persist_rag,
+            query_id=query_id,
+            created_at=created_at,
             user_id=current_user.id,
             query_text=rag_request.query,
-            query_type="rag",
-            processing_time_ms=processing_time,
-            status="completed",
-            retrieved_chunks_count=len(context_documents),
-            retrieved_documents=[str(doc.document_id) for doc in context_documents],
             similarity_threshold=rag_request.score_threshold,
-            llm_provider=llm_provider,
-            llm_model=llm_model,
-            input_tokens=llm_response.usage.get("prompt_tokens", 0),
-            output_tokens=llm_response.usage.get("completion_tokens", 0),
-            total_tokens=llm_response.usage.get("total_tokens", 0),
-            estimated_cost=0.0,  # Would calculate based on provider pricing
             session_id=rag_request.session_id,
             conversation_turn=rag_request.conversation_turn,
-            query_metadata={"rag_request": rag_request.model_dump(mode='json')}
-        )
-        
-        db.add(query_record)
-        db.commit()
-        db.refresh(query_record)
-        
-        # Create response record
-        response_record = QueryResponseModel(
-            query_id=query_record.id,
-            response_text=llm_response.content,
-            response_format="text",
-            context_used=context_used,
-            context_chunks=[str(doc.chunk_id) for doc in context_documents],
-            confidence_score=None,  # Could be calculated based on retrieval scores
-            source_attribution=[doc.source for doc in context_documents],
-            contains_citations=False,  # Could be analyzed
-            fact_checked=False
+            query_metadata=_rag_query_metadata(rag_request, llm_provider, llm_model, answer["threshold"]),
+            processing_time_ms=processing_time,
+            llm_provider=llm_provider,
+            llm_model=llm_model,
+            response_text=answer["response"],
+            usage=usage,
+            context_used=answer["context_used"],
+            context_chunks=answer["chunk_ids"],
+            retrieved_documents=answer["document_ids"],
+            source_attribution=sources,
+            is_cached=is_cached
         )
         
-        db.add(response_record)
-        db.commit()
-        
         # Build response
         rag_response = RAGResponse(
-            query_id=query_record.id,
+            query_id=query_id,
             query=rag_request.query,
-            response=llm_response.content,
+            response=answer["response"],
             context_documents=context_documents,
-            context_used=context_used,
+            context_used=answer["context_used"],
             processing_time_ms=processing_time,
             llm_provider=llm_provider,
             llm_model=llm_model,
-            input_tokens=llm_response.usage.get("prompt_tokens", 0),
-            output_tokens=llm_response.usage.get("completion_tokens", 0),
-            total_tokens=llm_response.usage.get("total_tokens", 0),
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            total_tokens=usage.get("total_tokens", 0),
             estimated_cost=0.0,
             confidence_score=None,
-            source_attribution=list(set(doc.source for doc in context_documents)),
+            source_attribution=list(dict.fromkeys(sources)),  # unique, in retrieval order
             contains_citations=False,
             session_id=rag_request.session_id,
             conversation_turn=rag_request.conversation_turn,
-            created_at=query_record.created_at
+            created_at=created_at
         )
         
-        logger.info(f"RAG query completed for user {current_user.email}: {query_record.id}")
+        logger.info(f"RAG query completed for user {current_user.email}: {query_id}")
         return rag_response
         
     except Exception as e:
@@ -344,17 +559,14 @@ async def generate_rag_response(
         
         # Record failed query
         try:
-            failed_query = Query(
+            await run_in_threadpool(
+                _record_failed_rag,
                 user_id=current_user.id,
-                query_text=rag_request.query,
-                query_type="rag",
+                rag_request=rag_request.model_dump(mode='json'),
                 processing_time_ms=(time.time() - start_time) * 1000,
-                status="failed",
-                query_metadata={"error": str(e), "rag_request": rag_request.model_dump(mode='json')}
+                error=str(e)
             )
-            db.add(failed_query)
-            db.commit()
-        except:
+        except Exception:
             pass  # Don't fail twice
         
         raise HTTPException(
@@ -370,7 +582,7 @@ async def generate_rag_response_stream(
     db: DatabaseDep,
     vector_service: VectorServiceDep,
     llm_service: LLMServiceDep,
-    embedding_service: EmbeddingServiceDep
+    embedding_batcher: EmbeddingBatcherDep
 ):
     """
     Generate streaming RAG response
@@ -378,7 +590,7 @@ async def generate_rag_response_stream(
     try:
         start_time = time.time()
         # Generate query embedding
-        query_embedding = await embedding_service.embed_text(rag_request.query)
+        query_embedding = await embedding_batcher.embed(rag_request.query)
         
         # Retrieve relevant documents
         search_results = await vector_service.search_documents(
@@ -388,9 +600,17 @@ async def generate_rag_response_stream(
             score_threshold=rag_request.score_threshold
         )
         
-        # Format context documents
-        context_documents = [
-            {
+        # Format context documents, collecting every per-chunk view used below in the same pass
+        context_documents = []
+        context_texts = []
+        chunk_ids = []
+        document_ids = []
+        sources = []
+        chunk_token_counts = []
+        
+        for result in search_results:
+            metadata = result["metadata"]
+            context_documents.append({
                 "chunk_id": result["id"],
                 "document_id": result["document_id"],
                 "score": result["score"],
@@ -398,10 +618,13 @@ async def generate_rag_response_stream(
                 "source": result["source"],
                 "page_number": result.get("page_number"),
                 "chunk_index": result["chunk_index"],
-                "doc_metadata": result["metadata"]
-            }
-            for result in search_results
-        ]
+                "doc_metadata": metadata
+            })
+            context_texts.append(result["text"])
+            chunk_ids.append(str(result["id"]))
+            document_ids.append(str(result["document_id"]))
+            sources.append(result["source"])
+            chunk_token_counts.append((metadata or {}).get("token_count"))
         
         # Use user's LLM configuration if not specified
         llm_provider = rag_request.llm_provider or getattr(current_user, "llm_provider", None) or "anthropic"
@@ -427,36 +650,92 @@ async def generate_rag_response_stream(
             processing_time_ms=None,
             status="processing",
             retrieved_chunks_count=len(context_documents),
-            retrieved_documents=[str(doc["document_id"]) for doc in context_documents],
+            retrieved_documents=document_ids,
             similarity_threshold=rag_request.score_threshold,
             llm_provider=llm_provider,
             llm_model=llm_model,
             input_tokens=0,
             output_tokens=0,
-            total_tokens=0,
             estimated_cost=0.0,
             session_id=rag_request.session_id,
             conversation_turn=rag_request.conversation_turn,
-            query_metadata={"rag_request": rag_request.model_dump(mode='json')}
+            query_metadata=_rag_query_metadata(rag_request, llm_provider, llm_model, rag_request.score_threshold)
         )
-        db.add(query_record)
-        db.commit()
-        db.refresh(query_record)
+        def save_query_record():
+            db.add(query_record)
+            db.commit()
+            db.refresh(query_record)
 
-        buffered_content_parts: list[str] = []
+        await run_in_threadpool(save_query_record)
+
+        # Computed once up front for persistence
+        context_used = "\n\n".join(context_texts)
+        
+        # Streamed text is appended to one buffer (no list of parts to join at the end)
+        content_buf = io.StringIO()
+        char_count = 0
+
+        def persist_stream_result():
+            """Mark the query completed/failed and store the response (runs in a worker thread)"""
+            # Compute elapsed time from record creation to now
+            try:
+                processing_time = (time.time() - query_record.created_at.timestamp()) * 1000
+            except Exception:
+                processing_time = None
+            response_text = content_buf.getvalue()
+            # Use a fresh session because request-scoped session may be closed
+            s = SessionLocal()
+            try:
+                q = s.query(Query).filter(Query.id == query_record.id).first()
+                if q:
+                    q.processing_time_ms = processing_time
+                    q.status = "completed" if char_count else "failed"
+                    # Streaming providers report no usage; count it here, reusing the chunk
+                    # token counts stored at ingest (older chunks are tokenized now)
+                    try:
+                        input_tokens_est = count_tokens(rag_request.query, llm_model) + sum(
+                            tokens or count_tokens(text)
+                            for tokens, text in zip(chunk_token_counts, context_texts)
+                        )
+                        output_tokens_est = count_tokens(response_text, llm_model) if char_count else 0
+                        q.input_tokens = input_tokens_est
+                        q.output_tokens = output_tokens_est
+                        meta = dict(q.query_metadata or {})
+                        meta["token_estimated"] = True
+                        q.query_metadata = meta
+                    except Exception:
+                        pass
+                    # Status update and response row go out in one commit
+                    if char_count and q.response is None:
+                        q.response = QueryResponseModel(
+                            response_text=response_text,
+                            response_format="text",
+                            context_used=context_used,
+                            context_chunks=chunk_ids,
+                            confidence_score=None,
+                            source_attribution=sources,
+                            contains_citations=False,
+                            fact_checked=False
+                        )
+                    s.commit()
+            finally:
+                s.close()
 
         async def stream_generator():
+            nonlocal char_count
             try:
                 async for chunk in response_stream:
                     # buffer content to persist after stream ends
                     if isinstance(chunk, str):
-                        buffered_content_parts.append(chunk)
+                        content_buf.write(chunk)
+                        char_count += len(chunk)
                         yield f"data: {chunk}\n\n"
                     else:
                         # if provider yields dicts, try to extract 'content'
                         text = getattr(chunk, "content", None) or (chunk.get("content") if isinstance(chunk, dict) else None)
                         if text:
-                            buffered_content_parts.append(text)
+                            content_buf.write(text)
+                            char_count += len(text)
                             yield f"data: {text}\n\n"
                 yield "data: [DONE]\n\n"
             except Exception as e:
@@ -465,51 +744,7 @@ async def generate_rag_response_stream(
             finally:
                 # Persist final response and mark query completed/failed (use a new DB session)
                 try:
-                    full_content = "".join(buffered_content_parts)
-                    # Compute elapsed time from record creation to now
-                    try:
-                        processing_time = (time.time() - query_record.created_at.timestamp()) * 1000
-                    except Exception:
-                        processing_time = None
-                    # Use a fresh session because request-scoped session may be closed
-                    s = SessionLocal()
-                    try:
-                        q = s.query(Query).filter(Query.id == query_record.id).first()
-                        if q:
-                            q.processing_time_ms = processing_time
-                            q.status = "completed" if full_content else "failed"
-                            # Estimate token usage for streaming (approx 4 chars per token)
-                            try:
-                                context_text_concat = "\n\n".join([c["text"] for c in context_documents]) if context_documents else ""
-                                prompt_text = (rag_request.query or "") + "\n\n" + context_text_concat
-                                input_tokens_est = max(1, int(len(prompt_text) / 4)) if prompt_text else 0
-                                output_tokens_est = max(1, int(len(full_content) / 4)) if full_content else 0
-                                q.input_tokens = input_tokens_est
-                                q.output_tokens = output_tokens_est
-                                q.total_tokens = input_tokens_est + output_tokens_est
-                                meta = dict(q.query_metadata or {})
-                                meta["token_estimated"] = True
-                                q.query_metadata = meta
-                            except Exception:
-                                pass
-                            s.add(q)
-                            s.commit()
-                            if full_content and q.response is None:
-                                response_record = QueryResponseModel(
-                                    query_id=q.id,
-                                    response_text=full_content,
-                                    response_format="text",
-                                    context_used="\n\n".join([c["text"] for c in context_documents]) if context_documents else "",
-                                    context_chunks=[str(c["chunk_id"]) for c in context_documents],
-                                    confidence_score=None,
-                                    source_attribution=[c["source"] for c in context_documents],
-                                    contains_citations=False,
-                                    fact_checked=False
-                                )
-                                s.add(response_record)
-                                s.commit()
-                    finally:
-                        s.close()
+                    await run_in_threadpool(persist_stream_result)
                 except Exception as ex:
                     logger.error(f"Failed to persist streaming query: {ex}")
 
@@ -537,27 +772,49 @@ async def get_query_history(
     db: DatabaseDep,
     skip: int = 0,
     limit: int = 20,
-    session_id: Optional[str] = None
+    session_id: Optional[str] = None,
+    before: Optional[datetime] = None,
+    before_id: Optional[UUID] = None
 ):
     """
-    Get query history for the current user
+    Get query history for the current user, newest first (ties broken by id)
+    Pass before and before_id (the created_at and id of the last item seen) for
+    keyset paging; total and pages are only computed for skip-based paging
     """
-    try:
-        query = db.query(Query).filter(
-            Query.user_id == current_user.id
-        )
-        
+    def load_history() -> QueryHistory:
+        """Runs in a worker thread; may commit repairs"""
+        filters = [Query.user_id == current_user.id]
         if session_id:
-            query = query.filter(Query.session_id == session_id)
-        
-        query = query.order_by(Query.created_at.desc())
-        
-        total = query.count()
-        queries = query.offset(skip).limit(limit).all()
-        # Backfill any inconsistent records created by earlier streaming code
+            filters.append(Query.session_id == session_id)
+
+        total = None
+        # id breaks created_at ties, so no row is skipped or repeated across pages
+        order = (Query.created_at.desc(), Query.id.desc())
+        if before is not None:
+            # Keyset page: seek on (user_id[, session_id], created_at DESC, id DESC), no OFFSET or count
+            if before_id is not None:
+                seek = tuple_(Query.created_at, Query.id) < tuple_(before, before_id)
+            else:
+                seek = Query.created_at < before
+            queries = db.query(Query).options(selectinload(Query.response)).filter(
+                *filters, seek
+            ).order_by(*order).limit(limit).all()
+        else:
+            # Total comes back with every row via a window function (one round-trip)
+            rows = db.query(Query, func.count().over().label("total")).options(
+                selectinload(Query.response)
+            ).filter(*filters).order_by(*order).offset(skip).limit(limit).all()
+            queries = [row[0] for row in rows]
+            if rows:
+                total = rows[0][1]
+            else:
+                # Past the last page there are no rows to carry the total
+                total = db.query(func.count(Query.id)).filter(*filters).scalar() if skip else 0
+        # Backfill any inconsistent records created by earlier streaming code;
+        # responses were loaded with the page above, so this issues no per-row SELECTs
         repaired = False
         for q in queries:
-            if getattr(q, "response", None) is not None and (q.status == "processing" or q.processing_time_ms is None):
+            if q.response is not None and (q.status == "processing" or q.processing_time_ms is None):
                 try:
                     # If we have a response, compute processing time if missing
                     if q.processing_time_ms is None and getattr(q.response, "generated_at", None):
@@ -569,16 +826,21 @@ async def get_query_history(
                     repaired = True
                 except Exception:
                     pass
-        if repaired:
-            db.commit()
-        
-        return QueryHistory(
+
+        # Serialize before committing the repairs, which would expire every loaded row
+        history = QueryHistory(
             queries=queries,
             total=total,
             page=skip // limit + 1,
             size=limit,
-            pages=(total + limit - 1) // limit
+            pages=(total + limit - 1) // limit if total is not None else None
         )
+        if repaired:
+            db.commit()
+        return history
+
+    try:
+        return await run_in_threadpool(load_history)
         
     except Exception as e:
         logger.error(f"Failed to get query history: {e}")
@@ -598,10 +860,12 @@ async def get_query(
     Get specific query by ID
     """
     try:
-        query = db.query(Query).filter(
-            Query.id == query_id,
-            Query.user_id == current_user.id
-        ).first()
+        query = await run_in_threadpool(
+            lambda: db.query(Query).filter(
+                Query.id == query_id,
+                Query.user_id == current_user.id
+            ).first()
+        )
         
         if not query:
             raise HTTPException(
@@ -632,10 +896,12 @@ async def submit_query_feedback(
     Submit feedback for a query
     """
     try:
-        query = db.query(Query).filter(
-            Query.id == query_id,
-            Query.user_id == current_user.id
-        ).first()
+        query = await run_in_threadpool(
+            lambda: db.query(Query).filter(
+                Query.id == query_id,
+                Query.user_id == current_user.id
+            ).first()
+        )
         
         if not query:
             raise HTTPException(
@@ -647,7 +913,7 @@ async def submit_query_feedback(
         query.user_rating = feedback.rating
         query.feedback = feedback.feedback
         
-        db.commit()
+        await run_in_threadpool(db.commit)
         
         logger.info(f"Feedback submitted for query {query_id} by {current_user.email}")
         return {"message": "Feedback submitted successfully"}
@@ -672,63 +938,45 @@ async def get_query_analytics(
     Get query analytics for the current user
     """
     try:
-        from datetime import datetime, timedelta
-        from sqlalchemy import func
-        
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
         
-        # Base query for the period
-        base_query = db.query(Query).filter(
+        period_filters = (
             Query.user_id == current_user.id,
             Query.created_at >= start_date,
             Query.created_at <= end_date
         )
         
-        # Total queries in period
-        total_queries = base_query.count()
-        
-        # Queries today
-        queries_today = db.query(Query).filter(
-            Query.user_id == current_user.id,
-            Query.created_at >= today_start
-        ).count()
-        
-        # Average processing time
-        avg_processing_time = base_query.filter(
-            Query.processing_time_ms.isnot(None)
-        ).with_entities(func.avg(Query.processing_time_ms)).scalar() or 0.0
-        
-        # Average tokens per query
-        avg_tokens = base_query.filter(
-            Query.total_tokens > 0
-        ).with_entities(func.avg(Query.total_tokens)).scalar() or 0.0
-        
-        # Total cost
-        total_cost = base_query.with_entities(
-            func.sum(Query.estimated_cost)
-        ).scalar() or 0.0
+        # All scalar metrics for the period in one pass over the user's rows;
+        # AVG/SUM already skip NULLs, FILTER narrows the rest
+        totals = await run_in_threadpool(lambda: db.query(
+            func.count(Query.id).label("total_queries"),
+            func.count(Query.id).filter(Query.created_at >= today_start).label("queries_today"),
+            func.avg(Query.processing_time_ms).label("avg_processing_time"),
+            func.avg(Query.total_tokens).filter(Query.total_tokens > 0).label("avg_tokens"),
+            func.sum(Query.estimated_cost).label("total_cost"),
+            func.avg(Query.user_rating).label("avg_rating")
+        ).filter(*period_filters).one())
+        
+        total_queries = totals.total_queries
+        queries_today = totals.queries_today
+        avg_processing_time = totals.avg_processing_time or 0.0
+        avg_tokens = totals.avg_tokens or 0.0
+        total_cost = totals.total_cost or 0.0
+        avg_rating = totals.avg_rating
         
         # Top query types
-        query_types = db.query(
+        query_types = await run_in_threadpool(lambda: db.query(
             Query.query_type,
             func.count(Query.id).label('count')
-        ).filter(
-            Query.user_id == current_user.id,
-            Query.created_at >= start_date
-        ).group_by(Query.query_type).all()
+        ).filter(*period_filters).group_by(Query.query_type).all())
         
         top_query_types = [
             {"type": qtype, "count": count} 
             for qtype, count in query_types
         ]
         
-        # Average rating
-        avg_rating = base_query.filter(
-            Query.user_rating.isnot(None)
-        ).with_entities(func.avg(Query.user_rating)).scalar()
-        
         return QueryAnalytics(
             total_queries=total_queries,
             queries_today=queries_today,
@@ -0,0 +1,32 @@
+"""
+Cached ORJSON serialization for hot read endpoints
+"""
+from functools import lru_cache
+from typing import Any, Type
+
+import orjson
+from cachetools import TTLCache
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+# Serialized bodies keyed by (schema, id, updated_at); a row update changes the key
+_RESPONSE_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    """One TypeAdapter per response schema"""
+    return TypeAdapter(schema)
+
+
+def cached_model_response(schema: Type[BaseModel], obj: Any) -> Response:
+    """
+    Return obj rendered through schema as a raw JSON response,
+    reusing the serialized bytes while the row is unchanged
+    """
+    key = (schema.__name__, obj.id, obj.updated_at)
+    body = _RESPONSE_CACHE.get(key)
+    if body is None:
+        body = orjson.dumps(_adapter(schema).validate_python(obj, from_attributes=True).model_dump())
+        _RESPONSE_CACHE[key] = body
+    return Response(content=body, media_type="application/json")
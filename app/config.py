@@ -14,10 +14,19 @@ class Settings(BaseSettings):
     app_name: str = Field(default="RAG Console", env="APP_NAME")
     app_version: str = Field(default="1.0.0", env="APP_VERSION")
     debug: bool = Field(default=False, env="DEBUG")
+    # Store the full request body in RAG query_metadata (off by default: large and costly)
+    debug_audit: bool = Field(default=False, env="DEBUG_AUDIT")
     
     # Database Configuration
     database_url: str = Field(env="DATABASE_URL")
     redis_url: str = Field(env="REDIS_URL")
+    # Connection pool (ignored for SQLite). Set DB_NULL_POOL behind PgBouncer
+    # in transaction mode so it does the pooling instead
+    db_pool_size: int = Field(default=20, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, env="DB_MAX_OVERFLOW")
+    db_pool_timeout: int = Field(default=30, env="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(default=3600, env="DB_POOL_RECYCLE")
+    db_null_pool: bool = Field(default=False, env="DB_NULL_POOL")
     
     # Qdrant Configuration
     qdrant_host: str = Field(default="localhost", env="QDRANT_HOST")
@@ -28,6 +37,8 @@ class Settings(BaseSettings):
     jwt_secret_key: str = Field(env="JWT_SECRET_KEY")
     jwt_algorithm: str = Field(default="HS256", env="JWT_ALGORITHM")
     jwt_expire_minutes: int = Field(default=30, env="JWT_EXPIRE_MINUTES")
+    # bcrypt cost; hashes made with a higher cost are upgraded on the next login
+    bcrypt_rounds: int = Field(default=10, ge=10, env="BCRYPT_ROUNDS")
     
     # LLM Configuration
     openai_api_key: Optional[str] = Field(default=None, env="OPENAI_API_KEY")
@@ -1,7 +1,13 @@
 """
 SQLAlchemy base class and configuration
 """
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.types import JSON
 
 # Base class for all database models
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# JSON columns are stored as binary JSONB on Postgres (no re-parse on read, GIN-indexable);
+# other dialects such as the SQLite test database keep plain JSON
+JSONType = JSON().with_variant(JSONB(), "postgresql")
\ No newline at end of file
@@ -1,20 +1,43 @@
 """
 Database session configuration and management
 """
-from typing import Generator
+from typing import Any, Dict, Generator
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from app.config import settings
 
+
+def _json_serializer(value: Any) -> str:
+    """orjson for JSON columns (query metadata, chunk lists)"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _pool_options() -> Dict[str, Any]:
+    """Pool settings for the configured database"""
+    if "sqlite" in settings.database_url:
+        # For SQLite compatibility in development
+        return {"connect_args": {"check_same_thread": False}, "poolclass": StaticPool}
+    if settings.db_null_pool:
+        return {"poolclass": NullPool}
+    # Sized for the request threadpool: every in-flight sync DB call holds a connection
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+
+
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
     echo=settings.debug,
-    # For SQLite compatibility in development
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
-    poolclass=StaticPool if "sqlite" in settings.database_url else None,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    **_pool_options(),
 )
 
 # Create SessionLocal class
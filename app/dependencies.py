@@ -1,64 +1,85 @@
 """
 FastAPI dependencies for authentication and service injection (per-user model)
 """
+from functools import lru_cache
 from typing import Optional, Annotated
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models.user import User
+from app.models.user import RoleLevel, User
 from app.services.auth_service import AuthService
 from app.services.document_service import DocumentService
 from app.services.vector_service import QdrantVectorService
 from app.services.llm_service import LLMService
 from app.services.embedding_service import EmbeddingService
+from app.services.embedding_batcher import EmbeddingBatcher
 from app.services.cache_service import CacheService
 
 # Security scheme for JWT authentication
 security = HTTPBearer(auto_error=False)
 
 
-# Service dependencies (singletons)
+# Service dependencies (singletons: each is built once per process on first use)
+@lru_cache(maxsize=1)
 def get_auth_service() -> AuthService:
-    """Get authentication service instance"""
-    return AuthService()
+    """Get authentication service instance (token denylist kept in the shared cache)"""
+    return AuthService(get_cache_service())
 
 
+@lru_cache(maxsize=1)
 def get_document_service() -> DocumentService:
-    """Get document service instance"""
-    return DocumentService()
+    """Get document service instance (shares the embedding model and Qdrant clients)"""
+    return DocumentService(get_embedding_service(), get_vector_service())
 
 
+@lru_cache(maxsize=1)
 def get_vector_service() -> QdrantVectorService:
     """Get vector service instance"""
     return QdrantVectorService()
 
 
+@lru_cache(maxsize=1)
 def get_llm_service() -> LLMService:
     """Get LLM service instance"""
     return LLMService()
 
 
+@lru_cache(maxsize=1)
 def get_embedding_service() -> EmbeddingService:
-    """Get embedding service instance"""
+    """Get embedding service instance (model weights load once per process)"""
     return EmbeddingService()
 
 
+@lru_cache(maxsize=1)
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Get the process-wide embedding batcher for single query embeddings"""
+    return EmbeddingBatcher(get_embedding_service())
+
+
+@lru_cache(maxsize=1)
 def get_cache_service() -> CacheService:
-    """Get cache service instance"""
+    """Get cache service instance (one Redis connection pool and local tier per process)"""
     return CacheService()
 
 
 # Authentication dependencies
 async def get_current_user(
+    request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db),
     auth_service: AuthService = Depends(get_auth_service)
 ) -> User:
     """
     Get current authenticated user from JWT token
+    The user is loaded once per request and kept on request.state
     """
+    cached_user = getattr(request.state, "current_user", None)
+    if cached_user is not None:
+        return cached_user
+    
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,7 +88,8 @@ async def get_current_user(
         )
     
     try:
-        user = auth_service.get_user_by_token(db, credentials.credentials)
+        user = await run_in_threadpool(auth_service.get_user_by_token, db, credentials.credentials)
+        request.state.current_user = user
         return user
     except Exception:
         raise HTTPException(
@@ -98,7 +120,7 @@ def require_admin_role(
     """
     Require admin role for endpoint access
     """
-    if current_user.role != "admin":
+    if current_user.role_level < RoleLevel.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin role required"
@@ -112,7 +134,7 @@ def require_user_or_admin_role(
     """
     Require user or admin role for endpoint access
     """
-    if current_user.role not in ["user", "admin"]:
+    if current_user.role_level < RoleLevel.USER:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User or admin role required"
@@ -126,6 +148,7 @@ DocumentServiceDep = Annotated[DocumentService, Depends(get_document_service)]
 VectorServiceDep = Annotated[QdrantVectorService, Depends(get_vector_service)]
 LLMServiceDep = Annotated[LLMService, Depends(get_llm_service)]
 EmbeddingServiceDep = Annotated[EmbeddingService, Depends(get_embedding_service)]
+EmbeddingBatcherDep = Annotated[EmbeddingBatcher, Depends(get_embedding_batcher)]
 CacheServiceDep = Annotated[CacheService, Depends(get_cache_service)]
 
 CurrentUserDep = Annotated[User, Depends(get_current_active_user)]
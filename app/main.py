@@ -10,8 +10,9 @@ import structlog
 
 from app.config import settings
 from app.database import init_db, create_tables
-from app.services.vector_service import QdrantVectorService
+from app.dependencies import get_vector_service, get_llm_service, get_cache_service
 from app.api import auth_router, documents_router, queries_router
+from app.services.document_service import shutdown_pdf_pool
 
 # Configure logging
 structlog.configure(
@@ -48,8 +49,8 @@ async def lifespan(app: FastAPI):
         await init_db()
         logger.info("Database initialized successfully")
         
-        # Initialize Qdrant vector store
-        vector_service = QdrantVectorService()
+        # Initialize Qdrant vector store (and warm the shared service instance)
+        vector_service = get_vector_service()
         await vector_service.init_collection()
         logger.info("Vector store initialized successfully")
         
@@ -60,6 +61,9 @@ async def lifespan(app: FastAPI):
         else:
             logger.warning("Vector store health check failed")
         
+        # One Redis check per process; the app runs without the cache if it is down
+        get_cache_service().ping()
+        
         logger.info("Application startup completed")
         
     except Exception as e:
@@ -70,6 +74,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down RAG Console")
+    shutdown_pdf_pool()
 
 
 # Create FastAPI application
@@ -89,6 +94,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset pagination cursors are returned as a response header
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -153,7 +160,7 @@ async def detailed_health_check():
     
     # Check vector store
     try:
-        vector_service = QdrantVectorService()
+        vector_service = get_vector_service()
         vector_healthy = await vector_service.health_check()
         vector_status = "healthy" if vector_healthy else "unhealthy"
     except Exception as e:
@@ -161,8 +168,7 @@ async def detailed_health_check():
     
     # Check LLM services
     try:
-        from app.services.llm_service import LLMService
-        llm_service = LLMService()
+        llm_service = get_llm_service()
         available_providers = llm_service.get_available_providers()
         llm_status = f"healthy: {', '.join(available_providers)}"
     except Exception as e:
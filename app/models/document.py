@@ -2,12 +2,12 @@
 Document-related database models
 """
 import uuid
+from functools import cached_property
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Float
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Float, Index
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.types import JSON
 from sqlalchemy.orm import relationship
-from app.database.base import Base
+from app.database.base import Base, JSONType
 
 
 class Document(Base):
@@ -28,7 +28,7 @@ class Document(Base):
     file_path = Column(String(500), nullable=False)
     
     # Processing Status
-    status = Column(String(50), default="uploaded", index=True)  # uploaded, processing, processed, failed
+    status = Column(String(50), default="uploaded")  # uploaded, processing, processed, failed
     total_chunks = Column(Integer, default=0)
     processed_chunks = Column(Integer, default=0)
     
@@ -43,8 +43,8 @@ class Document(Base):
     embedding_model = Column(String(100), nullable=True)
     
     # Additional Metadata
-    doc_metadata = Column(JSON, default=dict)
-    tags = Column(JSON, default=list)
+    doc_metadata = Column(JSONType, default=dict)
+    tags = Column(JSONType, default=list)
     
     # Timestamps
     uploaded_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -56,6 +56,23 @@ class Document(Base):
     user = relationship("User", back_populates="documents")
     chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan")
     
+    # Composite indexes for per-user listing, newest first, optionally by status
+    __table_args__ = (
+        Index("ix_documents_user_status_uploaded", "user_id", "status", uploaded_at.desc()),
+        Index("ix_documents_user_uploaded", "user_id", "uploaded_at"),
+        # Containment (@>) filters on tags and metadata
+        Index("ix_documents_tags_gin", "tags", postgresql_using="gin", postgresql_ops={"tags": "jsonb_path_ops"}),
+        Index(
+            "ix_documents_metadata_gin", "doc_metadata",
+            postgresql_using="gin", postgresql_ops={"doc_metadata": "jsonb_path_ops"}
+        ),
+    )
+    
+    @cached_property
+    def id_str(self) -> str:
+        """String form of id, computed once per instance"""
+        return str(self.id)
+    
     def __repr__(self):
         return f"<Document(id={self.id}, filename='{self.filename}', user_id={self.user_id})>"
 
@@ -90,7 +107,7 @@ class DocumentChunk(Base):
     last_similarity_score = Column(Float, nullable=True)
     
     # Metadata
-    doc_metadata = Column(JSON, default=dict)
+    doc_metadata = Column(JSONType, default=dict)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -100,5 +117,10 @@ class DocumentChunk(Base):
     document = relationship("Document", back_populates="chunks")
     user = relationship("User")
     
+    # Ordered chunk lookups within a document
+    __table_args__ = (
+        Index("ix_chunks_doc_index", "document_id", "chunk_index"),
+    )
+    
     def __repr__(self):
         return f"<DocumentChunk(id={self.id}, chunk_index={self.chunk_index}, document_id={self.document_id})>"
\ No newline at end of file
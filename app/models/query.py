@@ -3,11 +3,10 @@ Query-related database models
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Float, Boolean
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Float, Boolean, Index, Computed
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.types import JSON
 from sqlalchemy.orm import relationship
-from app.database.base import Base
+from app.database.base import Base, JSONType
 
 
 class Query(Base):
@@ -30,7 +29,7 @@ class Query(Base):
     
     # Retrieval Context
     retrieved_chunks_count = Column(Integer, default=0)
-    retrieved_documents = Column(JSON, default=list)  # List of document IDs used
+    retrieved_documents = Column(JSONType, default=list)  # List of document IDs used
     similarity_threshold = Column(Float, default=0.7)
     
     # LLM Information
@@ -41,7 +40,9 @@ class Query(Base):
     # Token Usage (for cost tracking)
     input_tokens = Column(Integer, default=0)
     output_tokens = Column(Integer, default=0)
-    total_tokens = Column(Integer, default=0)
+    total_tokens = Column(  # Maintained by the database
+        Integer, Computed("coalesce(input_tokens, 0) + coalesce(output_tokens, 0)", persisted=True)
+    )
     estimated_cost = Column(Float, default=0.0)
     
     # Quality Metrics
@@ -53,7 +54,7 @@ class Query(Base):
     conversation_turn = Column(Integer, default=1)
     
     # Metadata
-    query_metadata = Column(JSON, default=dict)
+    query_metadata = Column(JSONType, default=dict)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -63,6 +64,14 @@ class Query(Base):
     user = relationship("User", back_populates="queries")
     response = relationship("QueryResponse", back_populates="query", uselist=False)
     
+    # Composite indexes for newest-first history, optionally within a session;
+    # id is the keyset tiebreaker for rows sharing a created_at
+    __table_args__ = (
+        Index("ix_queries_user_created_id", "user_id", created_at.desc(), id.desc()),
+        Index("ix_queries_user_session_created_id", "user_id", "session_id", created_at.desc(), id.desc()),
+        Index("ix_queries_user_type_created", "user_id", "query_type", created_at.desc(), postgresql_include=["id"]),
+    )
+    
     def __repr__(self):
         return f"<Query(id={self.id}, query_text='{self.query_text[:50]}...', user_id={self.user_id})>"
 
@@ -83,11 +92,11 @@ class QueryResponse(Base):
     
     # Context Information
     context_used = Column(Text, nullable=True)  # The retrieved context used
-    context_chunks = Column(JSON, default=list)  # List of chunk IDs used
+    context_chunks = Column(JSONType, default=list)  # List of chunk IDs used
     
     # Generation Metadata
     confidence_score = Column(Float, nullable=True)
-    source_attribution = Column(JSON, default=list)  # Sources used in response
+    source_attribution = Column(JSONType, default=list)  # Sources used in response
     
     # Quality Control
     contains_citations = Column(Boolean, default=False)
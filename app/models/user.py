@@ -2,11 +2,20 @@
 User-related database models
 """
 import uuid
+from enum import IntEnum
+from functools import cached_property
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer
+from sqlalchemy import Column, String, DateTime, Boolean, Integer, SmallInteger
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-from app.database.base import Base
+from app.database.base import Base, JSONType
+
+
+class RoleLevel(IntEnum):
+    """Privilege level of a role; each level includes the ones below it"""
+    VIEWER = 0
+    USER = 1
+    ADMIN = 2
 
 
 class User(Base):
@@ -21,7 +30,7 @@ class User(Base):
     # User Information
     email = Column(String(255), nullable=False, unique=True, index=True)
     username = Column(String(100), nullable=False)
-    hashed_password = Column(String(255), nullable=False)
+    hashed_password = Column(String(60), nullable=False)  # bcrypt hashes are exactly 60 chars
     
     # User Preferences 
     llm_provider = Column(String(50), default="openai")
@@ -30,7 +39,8 @@ class User(Base):
     
     # Role and Permissions
     role = Column(String(50), default="user")  # admin, user, viewer
-    permissions = Column(Text)  # JSON string of permissions
+    role_level = Column(SmallInteger, nullable=False, default=RoleLevel.USER)  # RoleLevel of role, for access checks
+    permissions = Column(JSONType, nullable=True)  # List of permission names
     
     # Status
     is_active = Column(Boolean, default=True, index=True)
@@ -45,5 +55,10 @@ class User(Base):
     documents = relationship("Document", back_populates="user", cascade="all, delete-orphan")
     queries = relationship("Query", back_populates="user", cascade="all, delete-orphan")
     
+    @cached_property
+    def id_str(self) -> str:
+        """String form of id, computed once per instance"""
+        return str(self.id)
+    
     def __repr__(self):
         return f"<User(id={self.id}, email='{self.email}')>"
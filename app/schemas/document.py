@@ -3,7 +3,7 @@ Document-related Pydantic schemas
 """
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from uuid import UUID
 
 
@@ -36,17 +36,16 @@ class DocumentResponse(BaseModel):
     processed_at: Optional[datetime]
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DocumentList(BaseModel):
     """Schema for paginated document list"""
     documents: List[DocumentResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
 
 
 class DocumentProcessRequest(BaseModel):
@@ -79,8 +78,7 @@ class DocumentChunkResponse(BaseModel):
     doc_metadata: Dict[str, Any]
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class DocumentSearchRequest(BaseModel):
@@ -90,6 +88,7 @@ class DocumentSearchRequest(BaseModel):
     score_threshold: float = Field(default=0.7, ge=0.0, le=1.0)
     document_ids: Optional[List[UUID]] = None
     tags: Optional[List[str]] = None
+    debug: bool = False  # include per-stage timings in the response
 
 
 class DocumentSearchResult(BaseModel):
@@ -109,4 +108,5 @@ class DocumentSearchResponse(BaseModel):
     query: str
     results: List[DocumentSearchResult]
     total_found: int
-    search_time_ms: float
\ No newline at end of file
+    search_time_ms: float
+    timings: Optional[Dict[str, float]] = None  # embed/search/format ms, debug only
\ No newline at end of file
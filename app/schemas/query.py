@@ -3,7 +3,7 @@ Query and RAG-related Pydantic schemas
 """
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from uuid import UUID
 
 
@@ -113,8 +113,7 @@ class QueryResponse(BaseModel):
     # Include response if available
     response: Optional["QueryResponseData"] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class QueryResponseData(BaseModel):
@@ -133,17 +132,16 @@ class QueryResponseData(BaseModel):
     cache_hit: bool
     generated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class QueryHistory(BaseModel):
     """Schema for query history"""
     queries: List[QueryResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
 
 
 class QueryFeedback(BaseModel):
@@ -1,19 +1,76 @@
 """
 Authentication service for per-user JWT authentication
 """
+import hashlib
+import logging
+import threading
+import time
 import uuid
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
-from jose import JWTError, jwt
+from typing import Optional, Sequence, Tuple, TypedDict
+from cachetools import LRUCache, TTLCache
+from jose import JWTError, jwk, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
 from fastapi import HTTPException, status
-from app.models.user import User
+from app.models.user import RoleLevel, User
+from app.services.cache_service import CacheService
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# max_rounds flags older, costlier hashes for rehashing at the configured cost
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds
+)
+
+# last_login is kept to this resolution, so frequent logins don't rewrite the user row
+LAST_LOGIN_RESOLUTION = timedelta(minutes=5)
+
+# Access level stored alongside each role name; unknown roles get the least access
+_ROLE_LEVEL = {"admin": RoleLevel.ADMIN, "user": RoleLevel.USER, "viewer": RoleLevel.VIEWER}
+
+
+class TokenPayload(TypedDict):
+    """Claims carried by an access token"""
+    user_id: str
+    email: str
+    role: str
+    permissions: Sequence[str]  # a list once decoded
+    exp: int
+    iat: int
+    iss: str
+    type: str
+
+
+# Verified token payloads keyed by SHA-256 of the token, each kept until
+# min(now + TOKEN_CACHE_TTL_SECONDS, exp) so an entry never outlives its token
+TOKEN_CACHE_TTL_SECONDS = 30
+_token_cache: LRUCache = LRUCache(maxsize=10_000)
+_token_cache_lock = threading.Lock()
+
+# Column values of the user behind each token, so authenticated requests skip
+# the user lookup. Entries are not refreshed on account changes: deactivation or
+# a role change can take up to USER_CACHE_TTL_SECONDS to apply
+USER_CACHE_TTL_SECONDS = 60
+_user_cache: TTLCache = TTLCache(maxsize=5_000, ttl=USER_CACHE_TTL_SECONDS)
+_user_cache_lock = threading.Lock()
+_USER_CACHE_FIELDS = tuple(name for name in User.__table__.columns.keys() if name != "hashed_password")
+
+
+# Redis denylist of revoked tokens, keyed by token hash; each entry expires with its token.
+# It is read only when a payload enters _token_cache, so a token revoked on another
+# worker can keep working there for up to TOKEN_CACHE_TTL_SECONDS
+REVOKED_TOKEN_PREFIX = "auth:revoked:"
+
+
+def _token_key(token: str) -> str:
+    """Cache key for a bearer token (a collision-resistant hash, never the token itself)"""
+    return hashlib.sha256(token.encode()).hexdigest()
 
 
 class AuthService:
@@ -21,10 +78,14 @@ class AuthService:
     Authentication service handling JWT tokens and per-user management
     """
     
-    def __init__(self):
+    def __init__(self, cache_service: Optional[CacheService] = None):
         self.secret_key = settings.jwt_secret_key
         self.algorithm = settings.jwt_algorithm
         self.expire_minutes = settings.jwt_expire_minutes
+        # Key object built once; a raw secret is re-parsed into one on every encode/decode
+        self._key = jwk.construct(self.secret_key, self.algorithm)
+        # Shared token denylist; without it tokens cannot be revoked
+        self.cache_service = cache_service
     
     def hash_password(self, password: str) -> str:
         """Hash a password using bcrypt"""
@@ -39,37 +100,49 @@ class AuthService:
         user_id: str,
         email: str,
         role: str,
-        permissions: Optional[list] = None
+        permissions: Optional[Sequence[str]] = None
     ) -> str:
         """
         Create JWT access token for user
         """
         if permissions is None:
-            permissions = []
+            permissions = ()
             
-        # Token payload with user context
-        payload = {
+        # Token payload with user context; iat/exp as unix seconds from one clock read
+        now = int(time.time())
+        payload: TokenPayload = {
             "user_id": str(user_id),
             "email": email,
             "role": role,
             "permissions": permissions,
-            "exp": datetime.utcnow() + timedelta(minutes=self.expire_minutes),
-            "iat": datetime.utcnow(),
+            "exp": now + self.expire_minutes * 60,
+            "iat": now,
             "iss": settings.app_name,
             "type": "access_token"
         }
         
-        return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        return jwt.encode(payload, self._key, algorithm=self.algorithm)
     
-    def decode_token(self, token: str) -> Dict[str, Any]:
+    def decode_token(self, token: str) -> TokenPayload:
         """
         Decode and validate JWT token
-        Returns token payload if valid
+        Returns token payload if valid; recently verified tokens skip jwt.decode
+        and the revocation denylist
         """
+        key = _token_key(token)
+        now = time.time()
+        with _token_cache_lock:
+            entry: Optional[Tuple[float, TokenPayload]] = _token_cache.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                return entry[1]
+            with _token_cache_lock:
+                _token_cache.pop(key, None)
+        
         try:
             payload = jwt.decode(
                 token, 
-                self.secret_key, 
+                self._key, 
                 algorithms=[self.algorithm]
             )
             
@@ -80,6 +153,17 @@ class AuthService:
                     detail="Invalid token type"
                 )
             
+            if self._is_revoked(key):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token has been revoked"
+                )
+            
+            expires_at = min(now + TOKEN_CACHE_TTL_SECONDS, payload.get("exp", now))
+            if expires_at > now:
+                with _token_cache_lock:
+                    _token_cache[key] = (expires_at, payload)
+            
             return payload
             
         except JWTError as e:
@@ -102,18 +186,28 @@ class AuthService:
         if not user:
             return None
             
-        if not self.verify_password(password, user.hashed_password):
+        valid, new_hash = pwd_context.verify_and_update(password, user.hashed_password)
+        if not valid:
             return None
             
         if not user.is_active:
             return None
-            
-        # Update last login
-        user.last_login = datetime.utcnow()
-        db.commit()
         
+        # One-time rewrite of a hash made at an older cost
+        if new_hash:
+            user.hashed_password = new_hash
+            db.commit()
+        
+        # last_login is written by the caller after the response (see login_due)
         return user
     
+    def login_due(self, user: User, now: datetime) -> bool:
+        """
+        Whether last_login is stale enough to be rewritten for a login at now
+        Repeated logins within LAST_LOGIN_RESOLUTION cause no write
+        """
+        return user.last_login is None or user.last_login < now - LAST_LOGIN_RESOLUTION
+    
     def create_user(
         self,
         db: Session,
@@ -143,6 +237,7 @@ class AuthService:
             username=username,
             hashed_password=hashed_password,
             role=role,
+            role_level=_ROLE_LEVEL.get(role, RoleLevel.VIEWER),
             llm_provider=llm_provider,
             llm_model=llm_model,
             is_active=True,
@@ -155,11 +250,60 @@ class AuthService:
         
         return user
     
+    def invalidate_token(self, token: str) -> None:
+        """
+        Drop this process's cached payload and user for a token
+        The token itself stays valid; see revoke_token
+        """
+        key = _token_key(token)
+        with _token_cache_lock:
+            _token_cache.pop(key, None)
+        with _user_cache_lock:
+            _user_cache.pop(key, None)
+    
+    def _is_revoked(self, key: str) -> bool:
+        """
+        Whether the token with this cache key is on the denylist
+        Fails open when Redis can't be read: an outage would otherwise log every
+        user out, so the token is accepted and the miss is logged
+        """
+        if self.cache_service is None:
+            return False
+        revoked = self.cache_service.exists(REVOKED_TOKEN_PREFIX + key)
+        if revoked is None:
+            logger.warning("Token denylist unavailable; accepting token without a revocation check")
+            return False
+        return revoked
+    
+    def revoke_token(self, token: str) -> bool:
+        """
+        Deny a token on every worker until it expires (logout); workers that
+        verified it recently accept it for up to TOKEN_CACHE_TTL_SECONDS more
+        Returns False if the denylist could not be written
+        """
+        payload = self.decode_token(token)
+        self.invalidate_token(token)
+        
+        ttl_seconds = int(payload.get("exp", 0) - time.time())
+        if ttl_seconds <= 0:
+            return True
+        if self.cache_service is None:
+            return False
+        return self.cache_service.set_json(REVOKED_TOKEN_PREFIX + _token_key(token), 1, ttl_seconds=ttl_seconds)
+    
     def get_user_by_token(self, db: Session, token: str) -> User:
         """
         Get user from JWT token
+        Recently seen tokens return a detached User rebuilt from cached columns,
+        which can be up to USER_CACHE_TTL_SECONDS (60 s) stale
         """
         payload = self.decode_token(token)
+        key = _token_key(token)
+        with _user_cache_lock:
+            fields = _user_cache.get(key)
+        if fields is not None:
+            return User(**fields)
+        
         user_id = payload.get("user_id")
         email = payload.get("email")
         
@@ -169,28 +313,18 @@ class AuthService:
                 detail="Invalid token payload"
             )
         
-        # Prefer querying by email (unique and DB-agnostic)
+        # The token's user id is the primary key: look it up first (served from the
+        # identity map when this session already loaded the user); email is only a
+        # fallback for ids that don't resolve
         user = None
-        if email:
-            user = db.query(User).filter(
-                and_(
-                    User.email == email,
-                    User.is_active == True
-                )
-            ).first()
-        
-        if not user and user_id:
-            # Fallback: normalize UUID string from token to UUID object when supported by the DB/dialect
-            try:
-                user_uuid = uuid.UUID(str(user_id))
-            except Exception:
-                user_uuid = user_id  # fallback to raw value if not a valid UUID string
-            user = db.query(User).filter(
-                and_(
-                    User.id == user_uuid,
-                    User.is_active == True
-                )
-            ).first()
+        try:
+            user = db.get(User, uuid.UUID(str(user_id)))
+        except ValueError:
+            pass
+        if user is None and email:
+            user = db.query(User).filter(User.email == email).first()
+        if user is not None and not user.is_active:
+            user = None
         
         if not user:
             raise HTTPException(
@@ -198,6 +332,9 @@ class AuthService:
                 detail="User not found or inactive"
             )
         
+        with _user_cache_lock:
+            _user_cache[key] = {name: getattr(user, name) for name in _USER_CACHE_FIELDS}
+        
         return user
     
     def get_user_id_from_token(self, token: str) -> str:
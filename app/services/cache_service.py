@@ -2,52 +2,147 @@
 Simple Redis cache service for caching embeddings, search results, and LLM outputs
 """
 from __future__ import annotations
-import json
 import logging
-from typing import Any, Optional
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import timedelta
 
+import orjson
 import redis
+import xxhash
+from cachetools import LRUCache
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Process-local tier in front of Redis. Other workers' writes become visible
+# here within L1_TTL_SECONDS at most.
+L1_MAXSIZE = 10_000
+L1_TTL_SECONDS = 120
+
+# One pooled client per process; connections open on first use, not at import.
+# Values stay bytes: orjson parses them directly, with no str decode in between
+_client = redis.from_url(
+    settings.redis_url,
+    socket_keepalive=True,
+    health_check_interval=30,
+    max_connections=50
+)
+
+
+def hash_key(text: str) -> str:
+    """
+    Short, non-cryptographic digest for embedding free text in cache keys.
+    The algorithm prefix keeps keys from older hash schemes distinct.
+    """
+    return f"xxh3:{xxhash.xxh3_64_hexdigest(text)}"
+
 
 class CacheService:
     """
     Thin wrapper around redis-py for JSON get/set with TTL.
-    Keys should be small strings; values will be JSON-serialized.
+    Keys should be small strings; values will be JSON-serialized (orjson).
+    Hot keys are also held in-process as decoded objects, so callers
+    must treat returned values as read-only.
     """
 
     def __init__(self):
-        self._client = redis.from_url(settings.redis_url, decode_responses=True)
+        self._client = _client
+        # key -> (monotonic deadline, decoded value)
+        self._l1: LRUCache = LRUCache(maxsize=L1_MAXSIZE)
+
+    def ping(self) -> bool:
+        """Check Redis is reachable (startup check; cache calls never require it)"""
         try:
             self._client.ping()
             logger.info("Redis cache connected")
+            return True
         except Exception as e:
             logger.warning(f"Redis not available: {e}")
+            return False
+
+    def _l1_get(self, key: str) -> Optional[Any]:
+        entry: Optional[Tuple[float, Any]] = self._l1.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._l1.pop(key, None)
+            return None
+        return entry[1]
+
+    def _l1_set(self, key: str, value: Any, ttl_seconds: int = L1_TTL_SECONDS) -> None:
+        self._l1[key] = (time.monotonic() + min(ttl_seconds, L1_TTL_SECONDS), value)
 
     def get_json(self, key: str) -> Optional[Any]:
+        value = self._l1_get(key)
+        if value is not None:
+            return value
         try:
             raw = self._client.get(key)
             if raw is None:
                 return None
-            return json.loads(raw)
+            value = orjson.loads(raw)
+            self._l1_set(key, value)
+            return value
         except Exception as e:
             logger.warning(f"Redis GET failed for key={key}: {e}")
             return None
 
+    def mget_json(self, keys: List[str]) -> List[Optional[Any]]:
+        """Fetch several keys in one round-trip; misses and errors come back as None"""
+        if not keys:
+            return []
+        values = [self._l1_get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if not missing:
+            return values
+        try:
+            raws = self._client.mget([keys[i] for i in missing])
+        except Exception as e:
+            logger.warning(f"Redis MGET failed for {len(missing)} keys: {e}")
+            return values
+        for i, raw in zip(missing, raws):
+            if raw is not None:
+                values[i] = orjson.loads(raw)
+                self._l1_set(keys[i], values[i])
+        return values
+
     def set_json(self, key: str, value: Any, ttl_seconds: int = 300) -> bool:
         try:
-            payload = json.dumps(value)
+            payload = orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+            self._l1_set(key, value, ttl_seconds)
             self._client.set(key, payload, ex=ttl_seconds)
             return True
         except Exception as e:
             logger.warning(f"Redis SET failed for key={key}: {e}")
             return False
 
+    def mset_json(self, mapping: Dict[str, Any], ttl_seconds: int = 300) -> bool:
+        """Write several keys with one TTL in one pipelined round-trip"""
+        if not mapping:
+            return True
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, value in mapping.items():
+                self._l1_set(key, value, ttl_seconds)
+                pipe.set(key, orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY), ex=ttl_seconds)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Redis pipelined SET failed for {len(mapping)} keys: {e}")
+            return False
+
+    def exists(self, key: str) -> Optional[bool]:
+        """Whether key is set in Redis (bypassing the local tier); None if Redis can't be read"""
+        try:
+            return bool(self._client.exists(key))
+        except Exception as e:
+            logger.warning(f"Redis EXISTS failed for key={key}: {e}")
+            return None
+
     def delete(self, key: str) -> bool:
+        self._l1.pop(key, None)
         try:
             self._client.delete(key)
             return True
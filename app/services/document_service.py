@@ -1,65 +1,155 @@
 """
 Document processing service for file upload, text extraction, and chunking
 """
+import asyncio
 import os
 import uuid
-import aiofiles
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional, BinaryIO
+from typing import List, Dict, Any, Optional, BinaryIO, Tuple
 from fastapi import UploadFile, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, insert
 
 # Document processing imports
-import PyPDF2
+import pypdfium2 as pdfium
 from docx import Document as DocxDocument
+from docx.oxml.ns import qn
 
 from app.models.document import Document, DocumentChunk
 from app.models.user import User
 from app.services.embedding_service import EmbeddingService
 from app.services.vector_service import QdrantVectorService
+from app.services.llm_service import count_tokens_batch
+from app.workers.pdf_extraction import extract_pdf_pages
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Read uploads in bounded chunks so request memory stays flat regardless of file size
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Chunks embedded and written per batch during ingestion
+INGEST_BATCH_SIZE = 256
+
+# PDF text extraction is CPU-bound: large PDFs are split across worker processes,
+# leaving one core for the server; smaller ones are extracted inline, where
+# dispatch would cost more than it saves
+PDF_WORKERS = max((os.cpu_count() or 1) - 1, 1)
+PDF_PARALLEL_MIN_PAGES = 8
+
+# WordprocessingML tags read by the DOCX extractor
+_W_P = qn("w:p")
+_W_T = qn("w:t")
+_W_TEXT_EQUIVALENTS = {qn("w:tab"): "\t", qn("w:br"): "\n", qn("w:cr"): "\n"}
+
+
+def _as_uuid(value: Any) -> uuid.UUID:
+    """Coerce an id passed as a string, so it binds on dialects without a native UUID type"""
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def _mint_uuids(count: int) -> List[uuid.UUID]:
+    """Mint random (version 4) UUIDs from a single os.urandom read."""
+    raw = os.urandom(16 * count)
+    return [uuid.UUID(bytes=raw[i:i + 16], version=4) for i in range(0, len(raw), 16)]
+
+
+@lru_cache(maxsize=1)
+def _pdf_pool() -> ProcessPoolExecutor:
+    """
+    Worker processes for PDF text extraction, started on first use
+    Workers come from a forkserver rather than a fork of the server process, which by
+    then holds model threads, client connections and a running event loop
+    """
+    return ProcessPoolExecutor(
+        max_workers=PDF_WORKERS,
+        mp_context=multiprocessing.get_context("forkserver")
+    )
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the PDF worker processes, if any were started"""
+    if _pdf_pool.cache_info().currsize:
+        _pdf_pool().shutdown()
+        _pdf_pool.cache_clear()
+
+
+def _save_upload(source: BinaryIO, path: Path, max_size: int) -> int:
+    """
+    Copy an upload to path (blocking; run in a worker thread)
+    Returns the bytes read, stopping as soon as the count passes max_size
+    """
+    # Uploads spooled to disk are copied in the kernel, without passing through Python buffers
+    if getattr(source, "_rolled", False) and hasattr(os, "sendfile"):
+        source.flush()
+        src_fd = source.fileno()
+        start = source.tell()
+        size = os.fstat(src_fd).st_size - start
+        if size > max_size:
+            return size
+        copied = 0
+        with open(path, 'wb') as f:
+            while copied < size:
+                sent = os.sendfile(f.fileno(), src_fd, start + copied, size - copied)
+                if not sent:
+                    break
+                copied += sent
+        return copied
+    
+    size = 0
+    with open(path, 'wb') as f:
+        while chunk := source.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                break
+            f.write(chunk)
+    return size
+
 
 class DocumentService:
     """
     Service for handling document upload, processing, and management
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        embedding_service: Optional[EmbeddingService] = None,
+        vector_service: Optional[QdrantVectorService] = None
+    ):
         self.upload_dir = Path(settings.upload_dir)
         self.max_file_size = settings.max_file_size_mb * 1024 * 1024  # Convert to bytes
         self.allowed_types = settings.allowed_file_types
+        self._allowed_types = frozenset(t.lower() for t in self.allowed_types)
         
-        # Initialize services
-        self.embedding_service = EmbeddingService()
-        self.vector_service = QdrantVectorService()
+        # Initialize services, sharing the process-wide ones when given
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.vector_service = vector_service or QdrantVectorService()
         
         # Ensure upload directory exists
         self.upload_dir.mkdir(parents=True, exist_ok=True)
     
-    def _validate_file(self, file: UploadFile) -> bool:
+    def _validate_file(self, file: UploadFile, file_ext: str) -> bool:
         """
-        Validate uploaded file
+        Validate uploaded file (file_ext: its lowercase extension)
         """
-        # Check file size
-        if hasattr(file, 'size') and file.size > self.max_file_size:
+        # Check declared file size (also enforced while streaming, since it may be unknown)
+        if getattr(file, 'size', None) is not None and file.size > self.max_file_size:
             raise HTTPException(
                 status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                 detail=f"File size exceeds maximum allowed size of {settings.max_file_size_mb}MB"
             )
         
         # Check file type
-        if file.filename:
-            file_ext = file.filename.split('.')[-1].lower()
-            if file_ext not in self.allowed_types:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"File type '{file_ext}' not allowed. Allowed types: {', '.join(self.allowed_types)}"
-                )
+        if file.filename and file_ext not in self._allowed_types:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File type '{file_ext}' not allowed. Allowed types: {', '.join(self.allowed_types)}"
+            )
         
         return True
     
@@ -72,19 +162,26 @@ class DocumentService:
     ) -> Document:
         """
         Upload and store document file
+        The record is flushed but not committed; the caller owns the transaction
+        and is responsible for removing file_path if its commit fails
         """
         # Validate file
-        self._validate_file(file)
+        file_ext = file.filename.rsplit('.', 1)[-1].lower()
+        self._validate_file(file, file_ext)
         
         # Generate unique filename
-        unique_filename = f"{user_id}_{str(uuid.uuid4())}.{file.filename.split('.')[-1].lower()}"
+        unique_filename = f"{user_id}_{uuid.uuid4().hex}.{file_ext}"
         file_path = self.upload_dir / unique_filename
         
         try:
-            # Save file to disk
-            async with aiofiles.open(file_path, 'wb') as f:
-                content = await file.read()
-                await f.write(content)
+            # Stream file to disk in one worker thread, enforcing the size limit as bytes arrive
+            await file.seek(0)
+            file_size = await run_in_threadpool(_save_upload, file.file, file_path, self.max_file_size)
+            if file_size > self.max_file_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File size exceeds maximum allowed size of {settings.max_file_size_mb}MB"
+                )
             
             # Create document record
             document = Document(
@@ -92,19 +189,22 @@ class DocumentService:
                 filename=unique_filename,
                 original_filename=file.filename,
                 content_type=file.content_type,
-                file_size=len(content),
+                file_size=file_size,
                 file_path=str(file_path),
                 status="uploaded",
                 doc_metadata=metadata or {}
             )
             
             db.add(document)
-            db.commit()
-            db.refresh(document)
+            db.flush()
             
             logger.info(f"Document uploaded: {file.filename} for user {user_id}")
             return document
             
+        except HTTPException:
+            if file_path.exists():
+                file_path.unlink()
+            raise
         except Exception as e:
             # Clean up file if database operation fails
             if file_path.exists():
@@ -120,34 +220,44 @@ class DocumentService:
         Extract text content from various file types
         """
         try:
-            if content_type == "application/pdf" or file_path.endswith('.pdf'):
-                return self._extract_from_pdf(file_path)
-            elif content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" or file_path.endswith('.docx'):
-                return self._extract_from_docx(file_path)
-            elif content_type == "text/plain" or file_path.endswith('.txt'):
-                return self._extract_from_txt(file_path)
-            else:
-                # Try as plain text
-                return self._extract_from_txt(file_path)
+            # By extension, then declared content type; anything else is tried as plain text
+            extractor = (
+                self._EXTRACTORS_BY_SUFFIX.get(Path(file_path).suffix.lower())
+                or self._EXTRACTORS_BY_TYPE.get(content_type)
+                or DocumentService._extract_from_txt
+            )
+            return extractor(self, file_path)
                 
         except Exception as e:
             logger.error(f"Text extraction failed for {file_path}: {e}")
             return ""
     
     def _extract_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file"""
-        text_content = []
+        """Extract text from PDF file, splitting large PDFs across worker processes"""
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            page_count = len(pdf)
+        finally:
+            pdf.close()
+        logger.info(f"PDF extraction start: pages={page_count} file={file_path}")
         
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            logger.info(f"PDF extraction start: pages={len(pdf_reader.pages)} file={file_path}")
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text()
-                if page_text.strip():
-                    text_content.append(f"[Page {page_num + 1}]\n{page_text}")
-                else:
-                    logger.warning(f"PDF page had no extractable text: page={page_num+1}")
+        if page_count < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS == 1:
+            pages = extract_pdf_pages(file_path, 0, page_count)
+        else:
+            # One contiguous page range per worker, reassembled in submission (page) order
+            step = -(-page_count // PDF_WORKERS)
+            futures = [
+                _pdf_pool().submit(extract_pdf_pages, file_path, start, min(start + step, page_count))
+                for start in range(0, page_count, step)
+            ]
+            pages = [page for future in futures for page in future.result()]
+        
+        text_content = []
+        for page_num, page_text in pages:
+            if page_text.strip():
+                text_content.append(f"[Page {page_num + 1}]\n{page_text}")
+            else:
+                logger.warning(f"PDF page had no extractable text: page={page_num+1}")
         
         combined = "\n\n".join(text_content)
         logger.info(f"PDF extraction done: total_chars={len(combined)} file={file_path}")
@@ -155,12 +265,18 @@ class DocumentService:
     
     def _extract_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX file"""
-        doc = DocxDocument(file_path)
+        body = DocxDocument(file_path).element.body
         text_content = []
         
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                text_content.append(paragraph.text)
+        # Walk the body XML directly rather than building Paragraph/Run proxies;
+        # text nodes are grouped per top-level paragraph as doc.paragraphs did.
+        for paragraph in body.iterchildren(_W_P):
+            text = "".join(
+                _W_TEXT_EQUIVALENTS.get(node.tag) or node.text or ""
+                for node in paragraph.iter(_W_T, *_W_TEXT_EQUIVALENTS)
+            )
+            if text.strip():
+                text_content.append(text)
         
         return "\n\n".join(text_content)
     
@@ -169,6 +285,18 @@ class DocumentService:
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
             return file.read()
     
+    # Text extractors by file extension and by declared content type
+    _EXTRACTORS_BY_SUFFIX = {
+        ".pdf": _extract_from_pdf,
+        ".docx": _extract_from_docx,
+        ".txt": _extract_from_txt,
+    }
+    _EXTRACTORS_BY_TYPE = {
+        "application/pdf": _extract_from_pdf,
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document": _extract_from_docx,
+        "text/plain": _extract_from_txt,
+    }
+    
     async def process_document(
         self,
         db: Session,
@@ -209,9 +337,10 @@ class DocumentService:
             document.status = "processing"
             db.commit()
             
-            # Extract text content
-            text_content = self.extract_text_from_file(
-                document.file_path, 
+            # Extract text content in a worker thread so the event loop keeps serving requests
+            text_content = await run_in_threadpool(
+                self.extract_text_from_file,
+                document.file_path,
                 document.content_type
             )
             logger.info(
@@ -233,99 +362,156 @@ class DocumentService:
             chunks = self.embedding_service.chunk_text_for_embedding(
                 text_content,
                 max_chunk_size=512,
-                overlap_size=50
+                overlap_size=50,
+                chunk_strategy="sentence"
             )
             logger.info(
                 f"Chunking done: id={document.id} chunks={len(chunks)} first_chunk_chars={len(chunks[0]['text']) if chunks else 0}"
             )
             
-            # Generate embeddings for chunks
-            embedded_chunks = await self.embedding_service.embed_document_chunks(chunks)
-            # Log embedding lengths for first few chunks
+            # Embed and store in batches: each batch is written while the next one is
+            # embedded, so only a batch of embeddings is held at a time. The write runs
+            # on this session in a worker thread, so the loop below reads document
+            # values captured here rather than ORM attributes
+            document_uuid = document.id
+            filename = document.original_filename
+            content_type = document.content_type
+            embedding_model = None
+            pending_write: Optional[asyncio.Task] = None
             try:
-                emb_dims = [len(c.get("embedding", []) or []) for c in embedded_chunks[:3]]
-            except Exception:
-                emb_dims = []
-            logger.info(f"Embeddings generated: id={document.id} chunks_embedded={len(embedded_chunks)} sample_dims={emb_dims}")
-            
-            # Store chunks in database and vector store
-            vector_docs = []
-            chunk_records = []
-            
-            for chunk_data in embedded_chunks:
-                # Pre-generate a stable UUID for this chunk id
-                chunk_uuid = uuid.uuid4()
-                # Create database record
-                chunk_record = DocumentChunk(
-                    id=chunk_uuid,
-                    document_id=document.id,
-                    user_id=user_id,
-                    chunk_index=chunk_data["chunk_index"],
-                    text_content=chunk_data["text"],
-                    chunk_size=chunk_data["chunk_size"],
-                    start_char=chunk_data["start_char"],
-                    end_char=chunk_data["end_char"],
-                    vector_id=str(uuid.uuid4()),
-                    embedding_model=chunk_data["embedding_model"],
-                    embedding_dimension=chunk_data["embedding_dimension"]
-                )
+                for start in range(0, len(chunks), INGEST_BATCH_SIZE):
+                    embedded_chunks = await self.embedding_service.embed_document_chunks(
+                        chunks[start:start + INGEST_BATCH_SIZE]
+                    )
+                    embedding_model = embedding_model or embedded_chunks[0]["embedding_model"]
+                    chunk_rows, vector_docs = self._chunk_records(
+                        document_uuid, filename, content_type, user_id, embedded_chunks
+                    )
+                    
+                    if pending_write is not None:
+                        await pending_write
+                    pending_write = asyncio.create_task(
+                        self._store_chunk_batch(db, user_id, chunk_rows, vector_docs)
+                    )
+                    logger.info(
+                        f"Chunk batch embedded: id={document_uuid} chunks={start + len(embedded_chunks)}/{len(chunks)}"
+                    )
                 
-                chunk_records.append(chunk_record)
-                
-                # Prepare for vector store
-                vector_doc = {
-                    "document_id": str(document.id),
-                    "chunk_id": str(chunk_uuid),
-                    "text": chunk_data["text"],
-                    "embedding": chunk_data["embedding"],
-                    "source": document.original_filename,  # Add source field
-                    "page_number": chunk_data.get("page_number"),
-                    "metadata": {
-                        "filename": document.original_filename,
-                        "content_type": document.content_type,
-                        "chunk_index": chunk_data["chunk_index"],
-                        "start_char": chunk_data["start_char"],
-                        "end_char": chunk_data["end_char"]
-                    }
-                }
-                vector_docs.append(vector_doc)
-            logger.info(
-                f"Vector prep: id={document.id} vectors={len(vector_docs)} sample_vec_len={len(vector_docs[0]['embedding']) if vector_docs else 0}"
-            )
+                if pending_write is not None:
+                    await pending_write
+            except Exception:
+                if pending_write is not None and not pending_write.done():
+                    await asyncio.gather(pending_write, return_exceptions=True)
+                # Don't leave searchable vectors for a document without chunk rows
+                await self.vector_service.delete_document(user_id=user_id, document_id=str(document_uuid))
+                raise
             
-            # Store chunks in database
-            db.add_all(chunk_records)
+            # Update document status; the chunk rows are committed with it
+            document.status = "processed"
+            document.total_chunks = len(chunks)
+            document.processed_chunks = len(chunks)
+            document.collection_name = self.vector_service.default_collection
+            document.embedding_model = embedding_model
             
-            # Store embeddings in vector database
-            success = await self.vector_service.add_documents(
-                user_id=user_id,
-                documents=vector_docs
-            )
+            db.commit()
             
-            if success:
-                # Update document status
-                document.status = "processed"
-                document.total_chunks = len(chunks)
-                document.processed_chunks = len(chunks)
-                document.collection_name = self.vector_service.default_collection
-                document.embedding_model = embedded_chunks[0]["embedding_model"]
-                
-                db.commit()
-                
-                logger.info(f"Document {document_id} processed successfully with {len(chunks)} chunks (user={user_id})")
-                return True
-            else:
-                document.status = "failed"
-                db.commit()
-                logger.error(f"Vector upsert failed: id={document.id} user={user_id}")
-                return False
+            logger.info(f"Document {document_id} processed successfully with {len(chunks)} chunks (user={user_id})")
+            return True
                 
         except Exception as e:
+            db.rollback()  # discard any uncommitted chunk rows
             document.status = "failed"
             db.commit()
             logger.error(f"Document processing failed for {document_id}: {e}")
             return False
     
+    def _chunk_records(
+        self,
+        document_id: uuid.UUID,
+        filename: str,
+        content_type: str,
+        user_id: str,
+        embedded_chunks: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Build DocumentChunk row values and vector store documents for embedded chunks
+        Takes plain document values, never the ORM object, since it runs while a
+        batch write holds the session
+        """
+        document_id_str = str(document_id)
+        chunk_rows = []
+        vector_docs = []
+        # Lets RAG token accounting skip re-tokenizing retrieved chunks
+        token_counts = count_tokens_batch([chunk_data["text"] for chunk_data in embedded_chunks])
+        
+        chunk_uuids = _mint_uuids(len(embedded_chunks))
+        
+        for chunk_data, token_count, chunk_uuid in zip(embedded_chunks, token_counts, chunk_uuids):
+            # Pre-generated stable UUID for this chunk id
+            chunk_id = str(chunk_uuid)
+            # Database row values
+            chunk_rows.append({
+                "id": chunk_uuid,
+                "document_id": document_id,
+                "user_id": user_id,
+                "chunk_index": chunk_data["chunk_index"],
+                "text_content": chunk_data["text"],
+                "chunk_size": chunk_data["chunk_size"],
+                "start_char": chunk_data["start_char"],
+                "end_char": chunk_data["end_char"],
+                "vector_id": chunk_id,  # the Qdrant point id is the chunk id
+                "embedding_model": chunk_data["embedding_model"],
+                "embedding_dimension": chunk_data["embedding_dimension"]
+            })
+            
+            # Prepare for vector store
+            vector_docs.append({
+                "document_id": document_id_str,
+                "chunk_id": chunk_id,
+                "text": chunk_data["text"],
+                "embedding": chunk_data["embedding"],
+                "source": filename,  # Add source field
+                "page_number": chunk_data.get("page_number"),
+                "metadata": {
+                    "filename": filename,
+                    "content_type": content_type,
+                    "chunk_index": chunk_data["chunk_index"],
+                    "start_char": chunk_data["start_char"],
+                    "end_char": chunk_data["end_char"],
+                    "token_count": token_count
+                }
+            })
+        
+        return chunk_rows, vector_docs
+    
+    async def _store_chunk_batch(
+        self,
+        db: Session,
+        user_id: str,
+        chunk_rows: List[Dict[str, Any]],
+        vector_docs: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Insert a batch of chunk rows (left uncommitted) and upsert its vectors concurrently
+        Raises if either write fails
+        """
+        def insert_chunks() -> None:
+            # One executemany INSERT instead of a flush per object
+            db.execute(insert(DocumentChunk), chunk_rows)
+        
+        inserted, success = await asyncio.gather(
+            run_in_threadpool(insert_chunks),
+            self.vector_service.add_documents(
+                user_id=user_id,
+                documents=vector_docs
+            ),
+            return_exceptions=True
+        )
+        if isinstance(inserted, Exception):
+            raise inserted
+        if success is not True:
+            raise RuntimeError("Vector upsert failed")
+    
     async def delete_document(
         self,
         db: Session,
@@ -336,13 +522,15 @@ class DocumentService:
         Delete document and all associated data
         """
         try:
-            # Get document
-            document = db.query(Document).filter(
-                and_(
-                    Document.id == document_id,
-                    Document.user_id == user_id
-                )
-            ).first()
+            # Get document (blocking DB work runs in the threadpool, not on the event loop)
+            document = await run_in_threadpool(
+                lambda: db.query(Document).filter(
+                    and_(
+                        Document.id == document_id,
+                        Document.user_id == user_id
+                    )
+                ).first()
+            )
             
             if not document:
                 return False
@@ -350,13 +538,16 @@ class DocumentService:
             # Delete from vector store
             await self.vector_service.delete_document(user_id, str(document_id))
             
-            # Delete file from disk
-            if os.path.exists(document.file_path):
-                os.remove(document.file_path)
+            def remove_file_and_row():
+                # Delete file from disk
+                if os.path.exists(document.file_path):
+                    os.remove(document.file_path)
+                
+                # Delete from database (cascades to chunks)
+                db.delete(document)
+                db.commit()
             
-            # Delete from database (cascades to chunks)
-            db.delete(document)
-            db.commit()
+            await run_in_threadpool(remove_file_and_row)
             
             logger.info(f"Document {document_id} deleted successfully")
             return True
@@ -374,28 +565,61 @@ class DocumentService:
         """
         Get document with user validation
         """
+        try:
+            document_uuid = _as_uuid(document_id)
+        except ValueError:
+            return None
         return db.query(Document).filter(
             and_(
-                Document.id == document_id,
-                Document.user_id == user_id
+                Document.id == document_uuid,
+                Document.user_id == _as_uuid(user_id)
             )
         ).first()
     
+    def _document_filters(
+        self,
+        user_id: str,
+        status_filter: Optional[str] = None
+    ) -> list:
+        """
+        Build the filter criteria shared by document listing queries
+        """
+        filters = [Document.user_id == _as_uuid(user_id)]
+        if status_filter:
+            filters.append(Document.status == status_filter)
+        return filters
+    
     def list_documents(
         self,
         db: Session,
         user_id: str,
         skip: int = 0,
         limit: int = 100,
-        status_filter: Optional[str] = None
-    ) -> List[Document]:
+        status_filter: Optional[str] = None,
+        with_total: bool = True
+    ) -> Tuple[List[Document], Optional[int]]:
         """
-        List documents for a user with pagination and filtering
+        List documents for a user with pagination and filtering, newest first
+        Returns the page of documents and the total number of matches,
+        or None for the total when with_total is False
         """
-        # Base query with user filter
-        query = db.query(Document).filter(Document.user_id == user_id)
+        filters = self._document_filters(user_id, status_filter)
+        # Newest first; served by the (user_id[, status], uploaded_at) indexes
+        order = Document.uploaded_at.desc()
         
-        if status_filter:
-            query = query.filter(Document.status == status_filter)
+        if not with_total:
+            documents = db.query(Document).filter(*filters).order_by(order).offset(skip).limit(limit).all()
+            return documents, None
+        
+        # Total comes back with every row via a window function (one round-trip)
+        rows = db.query(
+            Document,
+            func.count().over().label("total")
+        ).filter(*filters).order_by(order).offset(skip).limit(limit).all()
+        
+        if rows:
+            return [row[0] for row in rows], rows[0][1]
         
-        return query.offset(skip).limit(limit).all()
\ No newline at end of file
+        # Past the last page there are no rows to carry the total
+        total = db.query(func.count(Document.id)).filter(*filters).scalar() if skip else 0
+        return [], total
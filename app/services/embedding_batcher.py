@@ -0,0 +1,94 @@
+"""
+Micro-batching for concurrent single-text embedding requests
+"""
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from app.services.embedding_service import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+# Dispatch once this many texts are queued, or after the delay, whichever comes first
+MAX_BATCH = 32
+MAX_DELAY_MS = 10
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces embed requests arriving within a short window into one
+    batched EmbeddingService.embed_text call; each caller gets its own vector
+    """
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        max_batch: int = MAX_BATCH,
+        max_delay_ms: float = MAX_DELAY_MS,
+        model_provider: str = "local"
+    ):
+        self._service = embedding_service
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.model_provider = model_provider
+
+        # Created on first use so they belong to the serving event loop
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self) -> None:
+        """Start the consumer task for the running loop if it is not running"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a single text as part of the next batch
+
+        Returns:
+            Embedding vector (empty if embedding failed)
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self) -> None:
+        """Drain the queue into batches for as long as the loop runs"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """Embed one batch and resolve each caller's future in order"""
+        texts = [text for text, _ in batch]
+        try:
+            embeddings = await self._service.embed_text(texts, self.model_provider)
+        except Exception as e:
+            logger.error(f"Batched embedding failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # embed_text signals failure with a single empty vector
+        if len(embeddings) != len(batch):
+            embeddings = [[] for _ in batch]
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
@@ -1,14 +1,38 @@
 """
 Embedding service for text vectorization using various models
 """
+import asyncio
+import hashlib
 import logging
+import re
+import unicodedata
 from typing import List, Union, Dict, Any
+import numpy as np
+from cachetools import LRUCache
 from sentence_transformers import SentenceTransformer
 import openai
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Number of normalized query embeddings kept per process
+QUERY_EMBEDDING_CACHE_SIZE = 4096
+
+# Texts per model forward pass / embeddings API request
+EMBEDDING_BATCH_SIZE = 64
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# Whitespace after sentence-ending punctuation, or a paragraph break
+_SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Canonicalize a query so trivially different spellings share one embedding
+    (NFKC, lowercase, collapsed whitespace)
+    """
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip().lower()
+
 
 class EmbeddingService:
     """
@@ -23,6 +47,9 @@ class EmbeddingService:
         self._local_model = None
         self._load_local_model()
         
+        # Query embeddings keyed by (model, provider, normalized-text digest)
+        self._query_cache: LRUCache = LRUCache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)
+        
         # Configure OpenAI if API key is available
         if settings.openai_api_key:
             openai.api_key = settings.openai_api_key
@@ -71,6 +98,33 @@ class EmbeddingService:
             logger.error(f"Embedding generation failed: {e}")
             return [] if single_text else [[]]
     
+    async def embed_query(
+        self,
+        text: str,
+        model_provider: str = "local"
+    ) -> np.ndarray:
+        """
+        Embed a search query, reusing the cached vector for repeated queries
+        
+        Returns:
+            float32 embedding vector (empty if embedding failed)
+        """
+        normalized = normalize_query(text)
+        key = (
+            self.model_name,
+            model_provider,
+            hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+        )
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        embedding = np.asarray(await self.embed_text(normalized, model_provider), dtype=np.float32)
+        # Don't cache failures
+        if embedding.size:
+            self._query_cache[key] = embedding
+        return embedding
+    
     async def _embed_with_local_model(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings using local SentenceTransformer model
@@ -80,7 +134,8 @@ class EmbeddingService:
         
         embeddings = self._local_model.encode(
             texts,
-            convert_to_tensor=False,
+            batch_size=EMBEDDING_BATCH_SIZE,
+            convert_to_numpy=True,
             normalize_embeddings=True
         )
         
@@ -89,7 +144,15 @@ class EmbeddingService:
     async def _embed_with_openai(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings using OpenAI API
+        Large inputs are sent as concurrent requests of EMBEDDING_BATCH_SIZE texts
         """
+        if len(texts) > EMBEDDING_BATCH_SIZE:
+            batches = await asyncio.gather(*(
+                self._embed_with_openai(texts[start:start + EMBEDDING_BATCH_SIZE])
+                for start in range(0, len(texts), EMBEDDING_BATCH_SIZE)
+            ))
+            return [embedding for batch in batches for embedding in batch]
+        
         try:
             response = await openai.Embedding.acreate(
                 input=texts,
@@ -117,19 +180,27 @@ class EmbeddingService:
         self, 
         text: str, 
         max_chunk_size: int = 512,
-        overlap_size: int = 50
+        overlap_size: int = 50,
+        chunk_strategy: str = "fixed"
     ) -> List[Dict[str, Any]]:
         """
         Split text into chunks suitable for embedding
         
         Args:
             text: Input text to chunk
-            max_chunk_size: Maximum characters per chunk
-            overlap_size: Overlap between chunks
+            max_chunk_size: Maximum characters per chunk (target size for the
+                sentence strategy, whose chunks fall within [target/2, 2*target])
+            overlap_size: Overlap between chunks (trailing sentences up to this
+                size for the sentence strategy)
+            chunk_strategy: "fixed" windows broken at word boundaries, or
+                "sentence" to pack whole sentences around max_chunk_size
         
         Returns:
             List of chunk dictionaries with text and metadata
         """
+        if chunk_strategy == "sentence" and len(text) > max_chunk_size:
+            return self._chunk_by_sentence(text, max_chunk_size, overlap_size)
+        
         if len(text) <= max_chunk_size:
             return [{
                 "text": text,
@@ -175,6 +246,81 @@ class EmbeddingService:
         
         return chunks
     
+    def _chunk_by_sentence(
+        self,
+        text: str,
+        max_chunk_size: int,
+        overlap_size: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Pack consecutive sentences into chunks of about max_chunk_size characters, so no
+        chunk cuts a sentence. Each chunk repeats the previous one's trailing sentences
+        up to overlap_size characters; sentences over max_chunk_size are split fixed-size.
+        Chunks shorter than max_chunk_size / 2 are merged into a neighbour, keeping
+        chunks within [max_chunk_size / 2, 2 * max_chunk_size] where the text allows.
+        """
+        # (start, end) of each sentence in text
+        spans = []
+        start = 0
+        for match in _SENTENCE_BREAK_RE.finditer(text):
+            spans.append((start, match.start()))
+            start = match.end()
+        if start < len(text):
+            spans.append((start, len(text)))
+        
+        # (start, end) of each chunk in text, before short ones are merged
+        segments = []
+        packed = []  # sentences in the chunk being packed
+        
+        for start, end in spans:
+            if end - start > max_chunk_size:
+                if packed:
+                    segments.append((packed[0][0], packed[-1][1]))
+                    packed = []
+                for piece in self.chunk_text_for_embedding(text[start:end], max_chunk_size, overlap_size):
+                    segments.append((start + piece["start_char"], start + piece["end_char"]))
+                continue
+            
+            if packed and end - packed[0][0] > max_chunk_size:
+                segments.append((packed[0][0], packed[-1][1]))
+                # Carry trailing sentences forward as overlap, never the whole chunk,
+                # and only as many as leave room for this sentence
+                carried = 0
+                for sentence_start, _ in reversed(packed[1:]):
+                    if packed[-1][1] - sentence_start > overlap_size or end - sentence_start > max_chunk_size:
+                        break
+                    carried += 1
+                packed = packed[len(packed) - carried:] if carried else []
+            packed.append((start, end))
+        
+        if packed:
+            segments.append((packed[0][0], packed[-1][1]))
+        
+        min_chunk_size = max_chunk_size // 2
+        merged = []
+        for start, end in segments:
+            if merged:
+                prev_start, prev_end = merged[-1]
+                is_short = end - start < min_chunk_size or prev_end - prev_start < min_chunk_size
+                if is_short and end - prev_start <= 2 * max_chunk_size:
+                    merged[-1] = (prev_start, max(prev_end, end))
+                    continue
+            merged.append((start, end))
+        
+        chunks = []
+        for start, end in merged:
+            chunk_text = text[start:end].strip()
+            if chunk_text:
+                chunks.append({
+                    "text": chunk_text,
+                    "chunk_index": len(chunks),
+                    "start_char": start,
+                    "end_char": end,
+                    "chunk_size": len(chunk_text)
+                })
+        
+        return chunks
+    
     async def embed_document_chunks(
         self,
         chunks: List[Dict[str, Any]],
@@ -196,8 +342,11 @@ class EmbeddingService:
         # Extract text from chunks
         texts = [chunk["text"] for chunk in chunks]
         
-        # Generate embeddings
+        # Generate embeddings for the whole document in one batched call
         embeddings = await self.embed_text(texts, model_provider)
+        # embed_text signals failure with a single empty vector
+        if len(embeddings) != len(chunks) or not embeddings[0]:
+            raise ValueError(f"Embedding failed for {len(chunks)} chunks")
         
         # Add embeddings to chunks
         for i, chunk in enumerate(chunks):
@@ -215,8 +364,6 @@ class EmbeddingService:
         """
         Calculate cosine similarity between two embeddings
         """
-        import numpy as np
-        
         # Convert to numpy arrays
         vec1 = np.array(embedding1)
         vec2 = np.array(embedding2)
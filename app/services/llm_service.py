@@ -4,16 +4,60 @@ Modular LLM service supporting multiple providers (OpenAI, Anthropic, local mode
 import json
 import logging
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, AsyncGenerator, Union
 from dataclasses import dataclass
 
 # LLM Provider imports
 import openai
 import anthropic
+import tiktoken
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Used for models tiktoken doesn't know (e.g. Claude) and at ingest, where the model is not known yet
+DEFAULT_TOKEN_ENCODING = "cl100k_base"
+# Length-based estimate when no tokenizer can be loaded (tiktoken fetches its tables on first use)
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=32)
+def _token_encoding(model: Optional[str]) -> Optional[tiktoken.Encoding]:
+    """Tokenizer for a model, loaded once; None if it can't be loaded"""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model or "")
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_TOKEN_ENCODING)
+    except Exception as e:
+        logger.warning(f"Tokenizer unavailable for model={model}, estimating from length: {e}")
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count tokens in text for the given model
+    Falls back to a length estimate when no tokenizer is available
+    """
+    if not text:
+        return 0
+    encoding = _token_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens_batch(texts: List[str], model: Optional[str] = None) -> List[int]:
+    """
+    Token counts for many texts in one tokenizer call (encoded in parallel threads);
+    same results as count_tokens on each
+    """
+    encoding = _token_encoding(model)
+    if encoding is None:
+        return [max(1, len(text) // CHARS_PER_TOKEN) if text else 0 for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+
 
 @dataclass
 class LLMResponse:
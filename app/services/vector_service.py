@@ -7,12 +7,15 @@ from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import (
     VectorParams, Distance, CollectionInfo, 
-    PointStruct, Filter, FieldCondition, MatchValue
+    PointStruct, Filter, FieldCondition, MatchValue, MatchAny
 )
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Points per upsert request; keeps large documents well under Qdrant's request size limit
+UPSERT_BATCH_SIZE = 256
+
 
 class QdrantVectorService:
     """
@@ -94,7 +97,8 @@ class QdrantVectorService:
         self,
         user_id: str,
         documents: List[Dict[str, Any]],
-        collection_name: str = None
+        collection_name: str = None,
+        batch_size: int = UPSERT_BATCH_SIZE
     ) -> bool:
         """
         Add documents to Qdrant with user isolation
@@ -103,6 +107,7 @@ class QdrantVectorService:
             user_id: User identifier for isolation
             documents: List of document dictionaries with text, embeddings, and metadata
             collection_name: Target collection name
+            batch_size: Points per upsert request
         """
         if collection_name is None:
             collection_name = self.default_collection
@@ -111,7 +116,8 @@ class QdrantVectorService:
             points = []
             
             for doc in documents:
-                point_id = str(uuid4())
+                # Reuse the chunk id as the point id so DocumentChunk.vector_id names the point
+                point_id = doc.get("chunk_id") or str(uuid4())
                 
                 # Ensure user_id is in payload for isolation
                 payload = doc.get("metadata", {}).copy()
@@ -133,11 +139,14 @@ class QdrantVectorService:
                 )
                 points.append(point)
             
-            # Upsert points to Qdrant
-            operation_info = await self.async_client.upsert(
-                collection_name=collection_name,
-                points=points
-            )
+            # Upsert points to Qdrant, one request per batch, sent concurrently
+            await asyncio.gather(*(
+                self.async_client.upsert(
+                    collection_name=collection_name,
+                    points=points[start:start + batch_size]
+                )
+                for start in range(0, len(points), batch_size)
+            ))
             
             logger.info(f"Added {len(points)} documents for user {user_id}")
             return True
@@ -163,7 +172,7 @@ class QdrantVectorService:
             query_embedding: Query vector embedding
             limit: Maximum number of results
             score_threshold: Minimum similarity score
-            filter_conditions: Additional filter conditions
+            filter_conditions: Additional payload filters; list values match any element
             collection_name: Target collection name
         
         Returns:
@@ -181,15 +190,14 @@ class QdrantVectorService:
                 )
             ]
             
-            # Add additional filter conditions
+            # Add additional filter conditions (a collection of values matches any of them)
             if filter_conditions:
                 for key, value in filter_conditions.items():
-                    must_conditions.append(
-                        FieldCondition(
-                            key=key,
-                            match=MatchValue(value=value)
-                        )
-                    )
+                    if isinstance(value, (list, tuple, set)):
+                        match = MatchAny(any=list(value))
+                    else:
+                        match = MatchValue(value=value)
+                    must_conditions.append(FieldCondition(key=key, match=match))
             
             search_filter = Filter(must=must_conditions)
             
@@ -0,0 +1,6 @@
+"""
+Functions run in worker processes
+
+Kept apart from app.services so a worker process only imports what the task needs,
+not the embedding model stack pulled in by the services package.
+"""
@@ -0,0 +1,28 @@
+"""
+PDF text extraction run in worker processes
+"""
+from typing import List, Tuple
+
+import pypdfium2 as pdfium
+
+
+def extract_pdf_pages(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extract text from pages [start, end) of a PDF
+    Runs in a worker process, so it opens its own document
+    """
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        pages = []
+        for page_num in range(start, end):
+            page = pdf[page_num]
+            textpage = page.get_textpage()
+            try:
+                # PDFium separates lines with CRLF
+                pages.append((page_num, textpage.get_text_range().replace("\r\n", "\n")))
+            finally:
+                textpage.close()
+                page.close()
+        return pages
+    finally:
+        pdf.close()
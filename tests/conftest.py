@@ -4,12 +4,16 @@ Pytest configuration and fixtures for testing
 import pytest
 import asyncio
 from typing import Generator
+from unittest.mock import MagicMock
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from fastapi.testclient import TestClient
 from app.main import app
 from app.database.base import Base
 from app.database.session import get_db
+from app.dependencies import get_document_service
+from app.models.user import User
+from app.services.document_service import DocumentService
 from app.config import settings
 
 
@@ -85,4 +89,29 @@ def sample_admin_user_data():
         "username": "testadmin",
         "password": "adminpassword123",
         "role": "admin"
-    }
\ No newline at end of file
+    }
+
+
+@pytest.fixture
+def auth_headers(client: TestClient, sample_user_data) -> dict:
+    """Sign up the sample user and return its bearer token header"""
+    response = client.post("/api/v1/auth/signup", json={
+        "email": sample_user_data["email"],
+        "username": sample_user_data["username"],
+        "password": sample_user_data["password"]
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def current_user(db_session: Session, auth_headers, sample_user_data) -> User:
+    """The signed-up sample user"""
+    return db_session.query(User).filter(User.email == sample_user_data["email"]).one()
+
+
+@pytest.fixture
+def document_service(client: TestClient) -> DocumentService:
+    """Document service with mocked embedding and vector clients, injected into the app"""
+    service = DocumentService(embedding_service=MagicMock(), vector_service=MagicMock())
+    app.dependency_overrides[get_document_service] = lambda: service
+    return service
@@ -2,7 +2,45 @@
 Basic API endpoint tests
 """
 import pytest
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
+from app.models.document import Document, DocumentChunk
+from app.models.query import Query
+from app.models.user import User
+
+
+def add_document(db_session, user, chunk_count=0, **values) -> Document:
+    """Insert a processed document owned by user, with chunk_count chunks"""
+    document = Document(
+        user_id=user.id,
+        filename="doc.txt",
+        original_filename="doc.txt",
+        content_type="text/plain",
+        file_size=1,
+        file_path="/tmp/doc.txt",
+        status="processed",
+        **values
+    )
+    db_session.add(document)
+    db_session.flush()
+    for index in range(chunk_count):
+        db_session.add(DocumentChunk(
+            document_id=document.id,
+            user_id=user.id,
+            chunk_index=index,
+            text_content=f"chunk {index}",
+            chunk_size=7
+        ))
+    db_session.commit()
+    return document
+
+
+def add_query(db_session, user, **values) -> Query:
+    """Insert a completed query owned by user"""
+    query = Query(user_id=user.id, query_text="What is X?", **values)
+    db_session.add(query)
+    db_session.commit()
+    return query
 
 
 class TestHealthEndpoints:
@@ -85,6 +123,157 @@ class TestDocumentEndpoints:
         assert response.status_code == 401
 
 
+class TestDocumentListEndpoint:
+    """Test document listing pages and when totals are counted"""
+    
+    def _seed_documents(self, db_session, user):
+        """Five documents, returned newest upload first"""
+        base = datetime.utcnow() - timedelta(hours=1)
+        documents = [
+            add_document(db_session, user, uploaded_at=base + timedelta(minutes=i)) for i in range(5)
+        ]
+        return [str(document.id) for document in reversed(documents)]
+    
+    def _list(self, client, auth_headers, **params):
+        """GET a page of two documents, asserting success"""
+        response = client.get("/api/v1/documents", params={"limit": 2, **params}, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()
+    
+    def test_first_page_has_totals(
+        self, client: TestClient, auth_headers, current_user, db_session, document_service
+    ):
+        """Test the first page counts the total and pages"""
+        expected = self._seed_documents(db_session, current_user)
+        
+        data = self._list(client, auth_headers)
+        
+        assert [d["id"] for d in data["documents"]] == expected[:2]
+        assert (data["total"], data["pages"], data["page"], data["size"]) == (5, 3, 1, 2)
+    
+    def test_later_page_skips_totals(
+        self, client: TestClient, auth_headers, current_user, db_session, document_service
+    ):
+        """Test later pages leave total and pages null unless with_total is set"""
+        expected = self._seed_documents(db_session, current_user)
+        
+        data = self._list(client, auth_headers, skip=2)
+        assert [d["id"] for d in data["documents"]] == expected[2:4]
+        assert (data["total"], data["pages"], data["page"]) == (None, None, 2)
+        
+        counted = self._list(client, auth_headers, skip=2, with_total=True)
+        assert [d["id"] for d in counted["documents"]] == expected[2:4]
+        assert (counted["total"], counted["pages"]) == (5, 3)
+    
+    def test_skip_past_end_counts_total(
+        self, client: TestClient, auth_headers, current_user, db_session, document_service
+    ):
+        """Test an empty page past the end still reports the total when asked"""
+        self._seed_documents(db_session, current_user)
+        
+        data = self._list(client, auth_headers, skip=10, with_total=True)
+        assert data["documents"] == []
+        assert (data["total"], data["pages"]) == (5, 3)
+        
+        uncounted = self._list(client, auth_headers, skip=10)
+        assert uncounted["documents"] == []
+        assert uncounted["total"] is None
+
+
+class TestDocumentChunkEndpoints:
+    """Test keyset-paginated document chunk listing"""
+    
+    def test_chunks_walk_pages(
+        self, client: TestClient, auth_headers, current_user, db_session, document_service
+    ):
+        """Test the X-Next-Cursor header leads to the next page, then stops"""
+        document = add_document(db_session, current_user, chunk_count=5)
+        url = f"/api/v1/documents/{document.id}/chunks"
+        
+        first = client.get(url, params={"limit": 3}, headers={**auth_headers, "Origin": "http://console.test"})
+        assert first.status_code == 200
+        assert [c["chunk_index"] for c in first.json()] == [0, 1, 2]
+        assert first.headers["X-Next-Cursor"] == "2"
+        # Browsers may only read the cursor if CORS exposes it
+        assert "x-next-cursor" in first.headers["Access-Control-Expose-Headers"].lower()
+        
+        second = client.get(url, params={"limit": 3, "after_chunk_index": 2}, headers=auth_headers)
+        assert second.status_code == 200
+        assert [c["chunk_index"] for c in second.json()] == [3, 4]
+        assert "X-Next-Cursor" not in second.headers
+    
+    def test_projected_chunks_walk_pages(
+        self, client: TestClient, auth_headers, current_user, db_session, document_service
+    ):
+        """Test fields= projections paginate with the same cursor"""
+        document = add_document(db_session, current_user, chunk_count=5)
+        url = f"/api/v1/documents/{document.id}/chunks"
+        
+        first = client.get(url, params={"limit": 3, "fields": "text_content"}, headers=auth_headers)
+        assert first.status_code == 200
+        assert first.json() == [
+            {"chunk_index": i, "text_content": f"chunk {i}"} for i in range(3)
+        ]
+        cursor = first.headers["X-Next-Cursor"]
+        
+        second = client.get(
+            url, params={"limit": 3, "fields": "text_content", "after_chunk_index": cursor}, headers=auth_headers
+        )
+        assert second.status_code == 200
+        assert [c["chunk_index"] for c in second.json()] == [3, 4]
+        assert "X-Next-Cursor" not in second.headers
+
+
+    def test_projection_always_includes_chunk_index(
+        self, client: TestClient, auth_headers, current_user, db_session, document_service
+    ):
+        """Test fields= returns only the requested columns plus chunk_index"""
+        document = add_document(db_session, current_user, chunk_count=2)
+        
+        response = client.get(
+            f"/api/v1/documents/{document.id}/chunks",
+            params={"fields": " chunk_size ,text_content,"},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 200
+        assert response.json() == [
+            {"chunk_index": 0, "text_content": "chunk 0", "chunk_size": 7},
+            {"chunk_index": 1, "text_content": "chunk 1", "chunk_size": 7},
+        ]
+    
+    def test_projection_unknown_field(
+        self, client: TestClient, auth_headers, current_user, db_session, document_service
+    ):
+        """Test unknown fields are rejected with 400, including non-response columns"""
+        document = add_document(db_session, current_user, chunk_count=1)
+        
+        response = client.get(
+            f"/api/v1/documents/{document.id}/chunks",
+            params={"fields": "text_content,user_id,bogus"},
+            headers=auth_headers
+        )
+        
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Unknown chunk fields: bogus, user_id"
+    
+    def test_projection_serializes_like_orm_path(
+        self, client: TestClient, auth_headers, current_user, db_session, document_service
+    ):
+        """Test UUID and datetime columns render identically in both response paths"""
+        document = add_document(db_session, current_user, chunk_count=2)
+        url = f"/api/v1/documents/{document.id}/chunks"
+        
+        full = client.get(url, headers=auth_headers).json()
+        projected = client.get(url, params={"fields": "id,document_id,created_at"}, headers=auth_headers).json()
+        
+        assert projected == [
+            {key: chunk[key] for key in ("id", "document_id", "chunk_index", "created_at")}
+            for chunk in full
+        ]
+        assert projected[0]["document_id"] == str(document.id)
+
+
 class TestQueryEndpoints:
     """Test RAG query endpoints"""
     
@@ -101,4 +290,124 @@ class TestQueryEndpoints:
         """Test query history without authentication"""
         response = client.get("/api/v1/queries/history")
         
-        assert response.status_code == 401
\ No newline at end of file
+        assert response.status_code == 401
+
+
+class TestQueryHistoryEndpoint:
+    """Test skip-based and keyset query history paging"""
+    
+    def _seed_history(self, db_session, user):
+        """Five queries, two sharing a created_at across the first page boundary"""
+        base = datetime.utcnow() - timedelta(hours=1)
+        offsets = [4, 3, 3, 2, 1]
+        for minutes in offsets:
+            add_query(db_session, user, created_at=base + timedelta(minutes=minutes))
+        return sorted(
+            db_session.query(Query).filter(Query.user_id == user.id).all(),
+            key=lambda q: (q.created_at, q.id.hex),
+            reverse=True
+        )
+    
+    def test_history_counts_total(self, client: TestClient, auth_headers, current_user, db_session):
+        """Test skip paging returns the window-count total, also past the last page"""
+        expected = self._seed_history(db_session, current_user)
+        
+        first = client.get("/api/v1/queries/history", params={"limit": 2}, headers=auth_headers).json()
+        assert [q["id"] for q in first["queries"]] == [str(q.id) for q in expected[:2]]
+        assert (first["total"], first["pages"]) == (5, 3)
+        
+        last = client.get("/api/v1/queries/history", params={"limit": 2, "skip": 4}, headers=auth_headers).json()
+        assert [q["id"] for q in last["queries"]] == [str(expected[4].id)]
+        assert last["total"] == 5
+        
+        beyond = client.get("/api/v1/queries/history", params={"limit": 2, "skip": 10}, headers=auth_headers).json()
+        assert beyond["queries"] == []
+        assert beyond["total"] == 5
+    
+    def test_history_keyset_walk(self, client: TestClient, auth_headers, current_user, db_session):
+        """Test seeking on (created_at, id) visits every query once, including timestamp ties"""
+        expected = self._seed_history(db_session, current_user)
+        
+        seen = []
+        params = {"limit": 2}
+        while True:
+            page = client.get("/api/v1/queries/history", params=params, headers=auth_headers).json()
+            if not page["queries"]:
+                break
+            seen.extend(q["id"] for q in page["queries"])
+            if "before" in params:
+                assert page["total"] is None and page["pages"] is None
+            last = page["queries"][-1]
+            params = {"limit": 2, "before": last["created_at"], "before_id": last["id"]}
+        
+        assert seen == [str(q.id) for q in expected]
+
+
+class TestQueryAnalyticsEndpoint:
+    """Test the per-user analytics summary"""
+    
+    def test_analytics_summary(self, client: TestClient, auth_headers, current_user, db_session):
+        """Test each metric covers only the user's queries in the period"""
+        now = datetime.utcnow()
+        add_query(
+            db_session, current_user, query_type="search", processing_time_ms=100.0,
+            input_tokens=10, output_tokens=20, estimated_cost=0.01, user_rating=4
+        )
+        add_query(
+            db_session, current_user, query_type="chat", processing_time_ms=300.0,
+            input_tokens=0, output_tokens=0, estimated_cost=0.03, user_rating=2,
+            created_at=now - timedelta(days=3)
+        )
+        add_query(
+            db_session, current_user, query_type="search", processing_time_ms=None,
+            input_tokens=50, output_tokens=40, estimated_cost=None, user_rating=None,
+            created_at=now - timedelta(days=3)
+        )
+        # Outside the period
+        add_query(
+            db_session, current_user, query_type="summarize", processing_time_ms=900.0,
+            input_tokens=500, output_tokens=500, estimated_cost=1.0, user_rating=5,
+            created_at=now - timedelta(days=40)
+        )
+        # Another user's query
+        other_user = User(
+            email="other@testcorp.com", username="other", hashed_password="x", role="user", role_level=1
+        )
+        db_session.add(other_user)
+        db_session.commit()
+        add_query(
+            db_session, other_user, query_type="search", processing_time_ms=5000.0,
+            input_tokens=1, output_tokens=1, estimated_cost=9.0, user_rating=1
+        )
+        
+        response = client.get("/api/v1/queries/analytics/summary", params={"days": 30}, headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_queries"] == 3
+        assert data["queries_today"] == 1
+        assert data["avg_processing_time_ms"] == pytest.approx(200.0)
+        # Queries without token usage are left out of the average
+        assert data["avg_tokens_per_query"] == pytest.approx(60.0)
+        assert data["total_cost"] == pytest.approx(0.04)
+        assert data["avg_rating"] == pytest.approx(3.0)
+        assert sorted(data["top_query_types"], key=lambda t: t["type"]) == [
+            {"type": "chat", "count": 1},
+            {"type": "search", "count": 2},
+        ]
+        period = datetime.fromisoformat(data["period_end"]) - datetime.fromisoformat(data["period_start"])
+        assert period == timedelta(days=30)
+        assert datetime.fromisoformat(data["period_end"]) >= now
+    
+    def test_analytics_summary_empty(self, client: TestClient, auth_headers):
+        """Test a user without queries gets zeroed metrics"""
+        response = client.get("/api/v1/queries/analytics/summary", headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_queries"] == 0
+        assert data["queries_today"] == 0
+        assert data["avg_tokens_per_query"] == 0.0
+        assert data["total_cost"] == 0.0
+        assert data["avg_rating"] is None
+        assert data["top_query_types"] == []
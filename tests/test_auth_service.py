@@ -3,9 +3,11 @@ Tests for authentication service (per-user model)
 """
 import pytest
 from unittest.mock import Mock
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from app.services.auth_service import AuthService
-from app.models.user import User
+from app.services.cache_service import CacheService
+from app.models.user import RoleLevel, User
 
 
 @pytest.fixture
@@ -14,6 +16,17 @@ def auth_service():
     return AuthService()
 
 
+@pytest.fixture
+def shared_cache():
+    """Dict-backed stand-in for the Redis cache shared by all workers"""
+    store = {}
+    cache = Mock(spec=CacheService)
+    cache.get_json.side_effect = store.get
+    cache.exists.side_effect = lambda key: key in store
+    cache.set_json.side_effect = lambda key, value, ttl_seconds=300: store.__setitem__(key, value) or True
+    return cache
+
+
 @pytest.fixture
 def mock_db():
     """Create mock database session"""
@@ -90,6 +103,20 @@ class TestAuthService:
         assert payload["email"] == email
         assert payload["role"] == "user"
         assert payload["permissions"] == ["read"]
+        assert payload["exp"] - payload["iat"] == auth_service.expire_minutes * 60
+    
+    def test_decode_token_tuple_permissions(self, auth_service):
+        """Test permissions passed as a tuple round-trip as a list"""
+        token = auth_service.create_access_token(
+            user_id="550e8400-e29b-41d4-a716-446655440001",
+            email="test@example.com",
+            role="admin",
+            permissions=("read", "write", "delete", "manage")
+        )
+        
+        payload = auth_service.decode_token(token)
+        
+        assert payload["permissions"] == ["read", "write", "delete", "manage"]
     
     def test_decode_token_invalid(self, auth_service):
         """Test JWT token decoding with invalid token"""
@@ -98,6 +125,144 @@ class TestAuthService:
         with pytest.raises(Exception):  # Should raise HTTPException
             auth_service.decode_token(invalid_token)
     
+    def test_decode_token_cached(self, auth_service, monkeypatch):
+        """Test a verified token is served from cache without re-verifying"""
+        from app.services import auth_service as auth_module
+        
+        token = auth_service.create_access_token(
+            user_id="550e8400-e29b-41d4-a716-446655440002",
+            email="cached@example.com",
+            role="user"
+        )
+        first = auth_service.decode_token(token)
+        
+        decode = Mock(side_effect=AssertionError("jwt.decode called on cache hit"))
+        monkeypatch.setattr(auth_module.jwt, "decode", decode)
+        
+        assert auth_service.decode_token(token) is first
+    
+    def test_decode_token_cache_expires(self, auth_service, monkeypatch):
+        """Test cached payloads expire and tokens are verified again"""
+        from app.services import auth_service as auth_module
+        
+        token = auth_service.create_access_token(
+            user_id="550e8400-e29b-41d4-a716-446655440003",
+            email="expiring@example.com",
+            role="user"
+        )
+        auth_service.decode_token(token)
+        
+        now = auth_module.time.time() + auth_module.TOKEN_CACHE_TTL_SECONDS + 1
+        monkeypatch.setattr(auth_module.time, "time", lambda: now)
+        decode = Mock(wraps=auth_module.jwt.decode)
+        monkeypatch.setattr(auth_module.jwt, "decode", decode)
+        
+        auth_service.decode_token(token)
+        decode.assert_called_once()
+    
+    def test_get_user_by_token_cached(self, auth_service, mock_db, sample_user):
+        """Test repeat lookups for a token skip the database until invalidated"""
+        token = auth_service.create_access_token(
+            user_id=sample_user.id,
+            email="cached-user@example.com",
+            role="user"
+        )
+        mock_db.get.return_value = sample_user
+        
+        assert auth_service.get_user_by_token(mock_db, token) is sample_user
+        cached = auth_service.get_user_by_token(mock_db, token)
+        
+        assert cached.email == sample_user.email
+        assert cached.id == sample_user.id
+        assert cached.hashed_password is None
+        assert mock_db.get.call_count == 1
+        
+        auth_service.invalidate_token(token)
+        auth_service.get_user_by_token(mock_db, token)
+        assert mock_db.get.call_count == 2
+    
+    def test_revoke_token_denied(self, shared_cache):
+        """Test a token revoked by this process is rejected at once"""
+        service = AuthService(shared_cache)
+        token = service.create_access_token(
+            user_id="550e8400-e29b-41d4-a716-446655440004",
+            email="revoked@example.com",
+            role="user"
+        )
+        service.decode_token(token)
+        
+        assert service.revoke_token(token) is True
+        ttl_seconds = shared_cache.set_json.call_args.kwargs["ttl_seconds"]
+        assert 0 < ttl_seconds <= service.expire_minutes * 60
+        
+        with pytest.raises(HTTPException) as exc_info:
+            service.decode_token(token)
+        assert exc_info.value.status_code == 401
+    
+    def test_revoked_elsewhere_denied_after_cache_ttl(self, shared_cache, monkeypatch):
+        """Test a token revoked by another worker is rejected once the cached payload expires"""
+        from app.services import auth_service as auth_module
+        
+        service = AuthService(shared_cache)
+        token = service.create_access_token(
+            user_id="550e8400-e29b-41d4-a716-446655440007",
+            email="revoked-elsewhere@example.com",
+            role="user"
+        )
+        service.decode_token(token)
+        # Another worker's logout only reaches the shared denylist
+        shared_cache.set_json(auth_module.REVOKED_TOKEN_PREFIX + auth_module._token_key(token), 1, ttl_seconds=60)
+        
+        # Cache hits skip the denylist, so this worker lags by up to the cache TTL
+        shared_cache.exists.reset_mock()
+        assert service.decode_token(token)["email"] == "revoked-elsewhere@example.com"
+        shared_cache.exists.assert_not_called()
+        
+        now = auth_module.time.time() + auth_module.TOKEN_CACHE_TTL_SECONDS + 1
+        monkeypatch.setattr(auth_module.time, "time", lambda: now)
+        with pytest.raises(HTTPException) as exc_info:
+            service.decode_token(token)
+        assert exc_info.value.status_code == 401
+    
+    def test_unreadable_denylist_fails_open(self, shared_cache, caplog):
+        """Test tokens are accepted, with a warning, while the denylist can't be read"""
+        shared_cache.exists.side_effect = None
+        shared_cache.exists.return_value = None
+        service = AuthService(shared_cache)
+        token = service.create_access_token(
+            user_id="550e8400-e29b-41d4-a716-446655440006",
+            email="denylist-down@example.com",
+            role="user"
+        )
+        
+        with caplog.at_level("WARNING", logger="app.services.auth_service"):
+            assert service.decode_token(token)["email"] == "denylist-down@example.com"
+        assert "denylist unavailable" in caplog.text
+    
+    def test_revoke_token_without_denylist(self, auth_service):
+        """Test revocation reports failure when there is no shared denylist"""
+        token = auth_service.create_access_token(
+            user_id="550e8400-e29b-41d4-a716-446655440005",
+            email="not-revoked@example.com",
+            role="user"
+        )
+        
+        assert auth_service.revoke_token(token) is False
+        assert auth_service.decode_token(token)["email"] == "not-revoked@example.com"
+    
+    def test_get_user_by_token_email_fallback(self, auth_service, mock_db, sample_user):
+        """Test the email lookup runs only when the token's user id doesn't resolve"""
+        token = auth_service.create_access_token(
+            user_id="not-a-uuid",
+            email=sample_user.email,
+            role="user"
+        )
+        mock_db.query.return_value.filter.return_value.first.return_value = sample_user
+        
+        assert auth_service.get_user_by_token(mock_db, token) is sample_user
+        mock_db.get.assert_not_called()
+        mock_db.query.assert_called_once_with(User)
+    
     def test_create_user_success(self, auth_service, mock_db):
         """Test user creation success"""
         # Mock database queries
@@ -117,12 +282,23 @@ class TestAuthService:
         assert user.email == "newuser@example.com"
         assert user.username == "newuser"
         assert user.role == "user"
+        assert user.role_level == RoleLevel.USER
         
         # Verify database operations
         mock_db.add.assert_called_once()
         mock_db.commit.assert_called_once()
         mock_db.refresh.assert_called_once()
     
+    def test_create_user_role_level(self, auth_service, mock_db):
+        """Test role levels are stored with the role, unknown roles getting the lowest"""
+        mock_db.query.return_value.filter.return_value.first.return_value = None
+        
+        admin = auth_service.create_user(mock_db, "admin@example.com", "admin", "password123", role="admin")
+        other = auth_service.create_user(mock_db, "other@example.com", "other", "password123", role="guest")
+        
+        assert admin.role_level == RoleLevel.ADMIN
+        assert other.role_level == RoleLevel.VIEWER
+    
     def test_create_user_duplicate_email(self, auth_service, mock_db, sample_user):
         """Test user creation with duplicate email"""
         # Mock existing user
@@ -166,6 +342,18 @@ class TestAuthService:
         
         assert authenticated_user is None
     
+    def test_authenticate_user_rehashes_costlier_hash(self, auth_service, mock_db, sample_user):
+        """Test a hash made at a higher bcrypt cost is upgraded on login"""
+        from passlib.context import CryptContext
+        
+        sample_user.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=12).hash("password")
+        mock_db.query.return_value.filter.return_value.first.return_value = sample_user
+        
+        assert auth_service.authenticate_user(mock_db, sample_user.email, "password") is sample_user
+        assert sample_user.hashed_password.startswith("$2b$10$")
+        assert auth_service.verify_password("password", sample_user.hashed_password)
+        mock_db.commit.assert_called_once()
+    
     def test_authenticate_user_not_found(self, auth_service, mock_db):
         """Test user authentication with non-existent user"""
         # Mock database query returning None
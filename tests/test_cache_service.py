@@ -0,0 +1,65 @@
+"""
+Tests for the two-tier cache service
+"""
+import pytest
+from unittest.mock import MagicMock
+from cachetools import LRUCache
+from app.services import cache_service
+from app.services.cache_service import CacheService
+
+
+@pytest.fixture
+def cache():
+    """Create cache service with a mocked Redis client"""
+    service = CacheService.__new__(CacheService)
+    service._client = MagicMock()
+    service._client.get.return_value = None
+    service._client.mget.return_value = []
+    service._l1 = LRUCache(maxsize=16)
+    return service
+
+
+class TestTwoTierCache:
+    """Test cases for the process-local tier in front of Redis"""
+
+    def test_read_through_skips_redis_on_repeat(self, cache):
+        """Test a Redis hit is served locally afterwards"""
+        cache._client.get.return_value = b'{"a": 1}'
+
+        assert cache.get_json("k") == {"a": 1}
+        assert cache.get_json("k") == {"a": 1}
+        cache._client.get.assert_called_once_with("k")
+
+    def test_mget_only_fetches_local_misses(self, cache):
+        """Test MGET asks Redis only for keys missing locally, keeping order"""
+        cache.set_json("a", [1])
+        cache._client.mget.return_value = [b"[2]", None]
+
+        assert cache.mget_json(["a", "b", "c"]) == [[1], [2], None]
+        cache._client.mget.assert_called_once_with(["b", "c"])
+
+    def test_mset_pipelines_writes(self, cache):
+        """Test MSET writes every key in one pipeline and fills the local tier"""
+        pipe = cache._client.pipeline.return_value
+
+        assert cache.mset_json({"a": 1, "b": [2]}, ttl_seconds=30) is True
+        pipe.set.assert_any_call("a", b"1", ex=30)
+        pipe.set.assert_any_call("b", b"[2]", ex=30)
+        pipe.execute.assert_called_once()
+        assert cache.mget_json(["a", "b"]) == [1, [2]]
+        cache._client.mget.assert_not_called()
+
+    def test_expired_and_deleted_entries_fall_back_to_redis(self, cache, monkeypatch):
+        """Test local entries expire with the write TTL and are dropped on delete"""
+        now = [1000.0]
+        monkeypatch.setattr(cache_service.time, "monotonic", lambda: now[0])
+
+        cache.set_json("k", "v", ttl_seconds=5)
+        assert cache.get_json("k") == "v"
+        now[0] += 6
+        assert cache.get_json("k") is None
+
+        cache.set_json("k", "v")
+        cache.delete("k")
+        assert cache.get_json("k") is None
+        assert cache._client.get.call_count == 2
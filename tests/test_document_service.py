@@ -0,0 +1,67 @@
+"""
+Tests for document service helpers
+"""
+import pytest
+from app.services import document_service
+from app.services.document_service import DocumentService
+
+
+def write_pdf(path, page_count):
+    """Write a minimal PDF with one line of text per page"""
+    font_ref = 3 + 2 * page_count
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{3 + 2 * i} 0 R" for i in range(page_count)), page_count
+        ),
+    ]
+    for i in range(page_count):
+        stream = f"BT /F1 12 Tf 72 720 Td (Page text {i + 1}) Tj ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_ref} 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = "%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    path.write_text(out)
+
+
+@pytest.fixture
+def document_service_instance():
+    """Create document service without embedding or vector clients"""
+    return DocumentService.__new__(DocumentService)
+
+
+class TestPdfExtraction:
+    """Test cases for PDF text extraction"""
+
+    def test_parallel_matches_serial(self, tmp_path, monkeypatch, document_service_instance):
+        """Test page ranges extracted in worker processes reassemble like the serial path"""
+        pdf_path = tmp_path / "pages.pdf"
+        write_pdf(pdf_path, 20)
+
+        monkeypatch.setattr(document_service, "PDF_WORKERS", 1)
+        serial = document_service_instance._extract_from_pdf(str(pdf_path))
+
+        monkeypatch.setattr(document_service, "PDF_WORKERS", 3)
+        try:
+            parallel = document_service_instance._extract_from_pdf(str(pdf_path))
+            assert document_service._pdf_pool.cache_info().currsize == 1
+        finally:
+            document_service.shutdown_pdf_pool()
+
+        assert parallel == serial
+        assert serial.count("[Page ") == 20
+        assert serial.startswith("[Page 1]\nPage text 1")
+        assert serial.endswith("[Page 20]\nPage text 20")
+        assert document_service._pdf_pool.cache_info().currsize == 0
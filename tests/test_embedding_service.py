@@ -0,0 +1,128 @@
+"""
+Tests for embedding service helpers
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from cachetools import LRUCache
+from app.services.embedding_service import EmbeddingService, normalize_query
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+@pytest.fixture
+def embedding_service():
+    """Create embedding service without loading a model"""
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.model_name = "test-model"
+    service.dimension = 3
+    service._local_model = None
+    service._query_cache = LRUCache(maxsize=16)
+    service.embed_text = AsyncMock(return_value=[0.1, 0.2, 0.3])
+    return service
+
+
+class TestQueryEmbeddingCache:
+    """Test cases for cached query embeddings"""
+
+    def test_normalize_query(self):
+        """Test case, width and whitespace variants normalize identically"""
+        assert normalize_query("  What   is\tX? ") == "what is x?"
+        assert normalize_query("ＷＨＡＴ is X?") == "what is x?"
+
+    def test_embed_query_cache_hit(self, embedding_service):
+        """Test equivalent queries share one embedding call"""
+        first = asyncio.run(embedding_service.embed_query("What is X?"))
+        second = asyncio.run(embedding_service.embed_query("what  is x?"))
+
+        assert first is second
+        assert first.dtype.name == "float32"
+        embedding_service.embed_text.assert_awaited_once_with("what is x?", "local")
+
+    def test_embed_query_failure_not_cached(self, embedding_service):
+        """Test failed embeddings are retried instead of cached"""
+        embedding_service.embed_text.return_value = []
+
+        result = asyncio.run(embedding_service.embed_query("query"))
+        asyncio.run(embedding_service.embed_query("query"))
+
+        assert result.size == 0
+        assert embedding_service.embed_text.await_count == 2
+
+
+class TestEmbeddingBatcher:
+    """Test cases for micro-batched query embeddings"""
+
+    def test_concurrent_embeds_share_one_call(self, embedding_service):
+        """Test concurrent callers are batched and get their own vectors in order"""
+        embedding_service.embed_text = AsyncMock(
+            side_effect=lambda texts, provider: [[float(len(t))] for t in texts]
+        )
+        batcher = EmbeddingBatcher(embedding_service, max_delay_ms=20)
+
+        async def run():
+            return await asyncio.gather(*(batcher.embed("x" * n) for n in range(1, 6)))
+
+        results = asyncio.run(run())
+
+        assert results == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        embedding_service.embed_text.assert_awaited_once()
+
+    def test_failed_batch_returns_empty_vectors(self, embedding_service):
+        """Test an embedding failure resolves every caller with an empty vector"""
+        embedding_service.embed_text = AsyncMock(return_value=[[]])
+        batcher = EmbeddingBatcher(embedding_service)
+
+        async def run():
+            return await asyncio.gather(batcher.embed("a"), batcher.embed("b"))
+
+        assert asyncio.run(run()) == [[], []]
+
+
+class TestSentenceChunking:
+    """Test cases for sentence-aware chunking"""
+
+    def test_chunks_end_on_sentence_boundaries(self, embedding_service):
+        """Test whole sentences are packed up to the size limit, with source offsets"""
+        text = "One two three. Four five six! Seven eight nine? Ten eleven."
+        chunks = embedding_service.chunk_text_for_embedding(
+            text, max_chunk_size=32, overlap_size=0, chunk_strategy="sentence"
+        )
+
+        assert [c["text"] for c in chunks] == ["One two three. Four five six!", "Seven eight nine? Ten eleven."]
+        assert [c["chunk_index"] for c in chunks] == [0, 1]
+        assert all(text[c["start_char"]:c["end_char"]] == c["text"] for c in chunks)
+
+    def test_long_sentence_falls_back_to_fixed_split(self, embedding_service):
+        """Test a sentence over the limit is split, keeping chunks within [limit/2, 2*limit]"""
+        text = "Short one. " + "word " * 30 + "end."
+        chunks = embedding_service.chunk_text_for_embedding(text, max_chunk_size=40, chunk_strategy="sentence")
+
+        assert chunks[0]["text"].startswith("Short one. word")
+        assert all(20 <= c["chunk_size"] <= 80 for c in chunks)
+        assert chunks[-1]["text"].endswith("end.")
+        assert [c["chunk_index"] for c in chunks] == list(range(len(chunks)))
+
+    def test_trailing_sentences_overlap(self, embedding_service):
+        """Test each chunk repeats the previous chunk's trailing sentences up to overlap_size"""
+        text = "One two three. Four five six! Seven eight nine? Ten eleven."
+        chunks = embedding_service.chunk_text_for_embedding(
+            text, max_chunk_size=32, overlap_size=20, chunk_strategy="sentence"
+        )
+
+        assert [c["text"] for c in chunks] == [
+            "One two three. Four five six!",
+            "Four five six! Seven eight nine?",
+            "Seven eight nine? Ten eleven.",
+        ]
+        assert all(text[c["start_char"]:c["end_char"]] == c["text"] for c in chunks)
+
+    def test_short_segments_merge_into_neighbours(self, embedding_service):
+        """Test sentences stranded beside a long one are merged rather than embedded alone"""
+        text = "Short one. " + "word " * 150 + ". Tail."
+        chunks = embedding_service.chunk_text_for_embedding(
+            text, max_chunk_size=512, overlap_size=50, chunk_strategy="sentence"
+        )
+
+        assert all(256 <= c["chunk_size"] <= 1024 for c in chunks)
+        assert chunks[0]["text"].startswith("Short one.")
+        assert chunks[-1]["text"].endswith("Tail.")